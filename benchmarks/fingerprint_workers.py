@@ -0,0 +1,48 @@
+"""
+Benchmarks parallel fingerprinting (clean-configs --workers) on a raw
+configs file, from 1 worker up to the number of CPU cores.
+
+From the repository root:
+    python -m benchmarks.fingerprint_workers raw.txt [max_workers]
+"""
+
+import os
+import sys
+import time
+
+from services.fingerprint_pool import fingerprint_configs
+from services.read_configs import read_configs
+
+
+def time_workers(configs: list[str], workers: int):
+    start = time.perf_counter()
+    fingerprints = [fgp for _, fgp in fingerprint_configs(configs, workers)]
+    return time.perf_counter() - start, fingerprints
+
+
+def main(args: list[str]):
+    if not args:
+        print(__doc__)
+        return
+
+    configs = read_configs(args[0])
+    max_workers = int(args[1]) if len(args) > 1 else os.cpu_count() or 1
+
+    print(
+        f"--- Fingerprinting {len(configs)} configs with 1..{max_workers} workers ---"
+    )
+
+    baseline, expected = time_workers(configs, 1)
+    print(f"   • 1 worker:   {baseline:.2f}s | {len(configs) / baseline:.0f} configs/s")
+
+    for workers in range(2, max_workers + 1):
+        elapsed, fingerprints = time_workers(configs, workers)
+        same = "same output" if fingerprints == expected else "DIFFERENT output"
+        print(
+            f"   • {workers} workers: {elapsed:.2f}s | {len(configs) / elapsed:.0f} configs/s | "
+            f"{baseline / elapsed:.1f}x | {same}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+"""
+Benchmarks the streaming message extractor against the old BeautifulSoup path
+on saved t.me/s pages.
+
+Save a few pages first, e.g.:
+    curl -s https://t.me/s/<channel> > pages/<channel>.html
+
+Then, from the repository root:
+    python -m benchmarks.message_extractor pages/*.html
+"""
+
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from services.message_extractor import extract_messages
+from services.telegram_web_scraping import (
+    get_message_datetime,
+    get_message_forwarded_from,
+    get_message_id,
+    get_message_links,
+    get_message_text,
+)
+
+ROUNDS = 20
+
+
+def parse_with_bs4(html: str):
+    """The old hot path: full tree, then find/find_all per message."""
+    soup = BeautifulSoup(html, "html.parser")
+    messages = soup.find_all("div", class_="tgme_widget_message")
+    messages.reverse()
+
+    records = []
+    for msg in messages:
+        # The crawlers read the datetime twice per message
+        get_message_datetime(msg)
+        records.append(
+            (
+                get_message_id(msg),
+                get_message_datetime(msg),
+                get_message_text(msg),
+                get_message_links(msg) or [],
+                get_message_forwarded_from(msg),
+            )
+        )
+    return records
+
+
+def parse_with_extractor(html: str):
+    return [
+        (
+            str(msg.id) if msg.id is not None else None,
+            msg.datetime,
+            msg.text,
+            msg.links,
+            msg.forwarded_from,
+        )
+        for msg in extract_messages(html)
+    ]
+
+
+def check_parity(pages: list[str]):
+    mismatches = 0
+    for html in pages:
+        old = parse_with_bs4(html)
+        new = parse_with_extractor(html)
+
+        if len(old) != len(new):
+            mismatches += 1
+            continue
+
+        for a, b in zip(old, new):
+            # The extractor keeps <br> as a newline, get_text() drops it
+            b_text = b[2].replace("\n", "") if b[2] else b[2]
+            if a[:2] != b[:2] or a[2] != b_text or a[3:] != b[3:]:
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def time_parser(parser, pages: list[str]):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for html in pages:
+            parser(html)
+    return (time.perf_counter() - start) / (ROUNDS * len(pages)) * 1000
+
+
+def main(files: list[str]):
+    if not files:
+        print(__doc__)
+        return
+
+    pages = []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+
+    print(f"--- Benchmarking {len(pages)} pages x {ROUNDS} rounds ---")
+
+    mismatches = check_parity(pages)
+    print(f"   • Pages with differing records: {mismatches}")
+
+    bs4_ms = time_parser(parse_with_bs4, pages)
+    extractor_ms = time_parser(parse_with_extractor, pages)
+
+    print(f"   • BeautifulSoup:     {bs4_ms:.2f} ms/page")
+    print(f"   • MessageExtractor:  {extractor_ms:.2f} ms/page")
+    print(f"   • Speedup:           {bs4_ms / extractor_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,103 +1,96 @@
 import asyncio
 import datetime
-import random
-import re
-
-import aiohttp
-from aiohttp_socks import ProxyConnector
 
 from models.settings import load_settings
-from models.v2ray_config import CONFIG_PATTERN
-from services.read_channels import read_channels
-from services.telegram_web_scraping import (
-    get_message_datetime,
-    get_message_id,
-    get_message_text,
-    load_channel_messages,
+from services.channel_crawler import (
+    CUTOFF_REACHED,
+    END_OF_HISTORY,
+    FETCH_FAILED,
+    NO_PAGINATION,
+    NOT_FOUND,
+    RESTRICTED,
+    crawl_channel,
 )
+from services.channel_status_cache import (
+    HAS_CONFIGS,
+    NO_CONFIGS,
+    UNREACHABLE,
+    ChannelStatusCache,
+    checked_since,
+    is_conclusive,
+    unreachable_verdict,
+)
+from services.message_consumers import ConfigDetector
+from services.output_writer import OutputWriter
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.read_channels import read_channels
 
 settings = load_settings("./settings.json")
 
+SKIP_VERDICTS = UNREACHABLE | {HAS_CONFIGS, NO_CONFIGS}
+
 
 async def check_channel(
     channel: str,
     cutoff_date: datetime.datetime,
-    session: aiohttp.ClientSession,
+    proxies: ProxyPool,
     semaphore: asyncio.Semaphore,
+    parser: ParseExecutor | None = None,
+    cache: ChannelStatusCache | None = None,
 ):
+    detector = ConfigDetector()
+
+    result = await crawl_channel(
+        channel,
+        cutoff_date,
+        proxies,
+        semaphore,
+        [detector],
+        settings.MAX_PAGES,
+        parser=parser,
+        prefetch=settings.PREFETCH_PAGES,
+    )
 
-    async with semaphore:
-        delay = random.uniform(1.5, 4.0)
-        await asyncio.sleep(delay)
-
-        last_msg_datetime = datetime.datetime.now(datetime.timezone.utc)
-        next_offset_id = None
-
-        for page_num in range(settings.MAX_PAGES):
-            if last_msg_datetime < cutoff_date:
-                print(
-                    f"✗ {channel:<30} | Time limit reached before loading page {page_num+1}"
-                )
-                break
-
-            messages = await load_channel_messages(channel, session, next_offset_id)
-
-            if not messages:
-                if page_num == 0:
-                    print(
-                        f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel"
-                    )
-                else:
-                    print(
-                        f"✗ {channel:<30} | End of history reached (No configs found)"
-                    )
-                return None
-
-            for msg in messages:
-                msg_datetime = get_message_datetime(msg)
-
-                if not msg_datetime:
-                    continue
-
-                if msg_datetime < cutoff_date:
-                    print(
-                        f"✗ {channel:<30} | Time limit reached ({msg_datetime.strftime('%Y-%m-%d')})"
-                    )
-                    return None
-
-                msg_text = get_message_text(msg)
-                if msg_text:
-                    found = re.findall(CONFIG_PATTERN, msg_text)
-                    if found:
-                        print(f"✓ {channel:<30}")
-                        return channel
-
-            last_msg_datetime = None
-            next_offset_id = None
-
-            for msg in reversed(messages):
-                p_id = get_message_id(msg)
-                p_date = get_message_datetime(msg)
-
-                if p_id and p_date:
-                    next_offset_id = p_id
-                    last_msg_datetime = p_date
-                    break
-
-            delay = random.uniform(0.5, 1.5)
-            await asyncio.sleep(delay)
-
-            if not last_msg_datetime or not next_offset_id:
-                print(f"✗ {channel:<30} | Error: Could not find ID for pagination")
-                return None
-
+    if detector.found:
+        if cache:
+            cache.set_verdict(channel, HAS_CONFIGS)
+        print(f"✓ {channel:<30}")
+        return channel
+
+    # A crawl cut short by a failed fetch is re-checked next run
+    if cache and is_conclusive(result.status):
+        verdict = unreachable_verdict(result.status)
+        if verdict:
+            cache.set_verdict(channel, verdict)
+        else:
+            cache.set_verdict(channel, NO_CONFIGS, checked_since(result, cutoff_date))
+
+    if result.status == RESTRICTED:
+        print(f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel")
+    elif result.status == NOT_FOUND:
+        print(f"✗ {channel:<30} | Channel Not Found (404)")
+    elif result.status == FETCH_FAILED:
+        print(f"✗ {channel:<30} | Fetch failed (No configs found so far)")
+    elif result.status == END_OF_HISTORY:
+        print(f"✗ {channel:<30} | End of history reached (No configs found)")
+    elif result.status == CUTOFF_REACHED and result.last_msg_datetime:
+        print(
+            f"✗ {channel:<30} | Time limit reached ({result.last_msg_datetime.strftime('%Y-%m-%d')})"
+        )
+    elif result.status == NO_PAGINATION:
+        print(f"✗ {channel:<30} | Error: Could not find ID for pagination")
+    else:
         print(
             f"✗ {channel:<30} | Scanned {settings.MAX_PAGES} pages (No configs found)"
         )
-        return None
+
+    return None
 
 
-async def check_channels(channels: list[str], days_back: int, output_file: str):
+async def check_channels(
+    channels: list[str], days_back: int, output_file: str, refresh: bool = False
+):
     cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
         days=days_back
     )
@@ -105,31 +98,50 @@ async def check_channels(channels: list[str], days_back: int, output_file: str):
     print(f"--- Checking {len(channels)} Channels ---")
     print(f"--- Cutoff Date: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("")
+    cache = ChannelStatusCache(settings.CHANNEL_STATUS_CACHE, refresh)
+    channels, cached = cache.split_channels(channels, SKIP_VERDICTS, cutoff_date)
+    if cached:
+        print(
+            f"--- Skipping {len(cached)} channels with cached verdicts (--refresh to re-check) ---"
+        )
+
+    verified = [ch for ch, verdict in cached.items() if verdict == HAS_CONFIGS]
 
-    connector = ProxyConnector.from_url(settings.PROXY_URL)
     sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
 
-    async with aiohttp.ClientSession(connector=connector) as session:
+    async with (
+        ProxyPool(
+            settings.PROXY_URL,
+            settings.REQUESTS_PER_SECOND,
+            settings.MAX_REQUESTS_PER_SECOND,
+        ) as proxies,
+        ParseExecutor(settings.PARSE_WORKERS) as parser,
+        OutputWriter(output_file) as writer,
+    ):
+        # Channels verified by an earlier run go straight to the output
+        for channel in verified:
+            writer.write(channel)
+
         tasks = []
         for channel in channels:
-            task = check_channel(channel, cutoff_date, session, sem)
+            task = check_channel(channel, cutoff_date, proxies, sem, parser, cache)
             tasks.append(task)
 
-        found_count = 0
+        found_count = len(verified)
 
         for future in asyncio.as_completed(tasks):
             result = await future
             if result:
                 found_count += 1
-                with open(output_file, "a", encoding="utf-8") as f:
-                    f.write(result + "\n")
+                writer.write(result)
+
+    cache.close()
 
     print(f"\nScan Complete! Found {found_count} valid channels.")
     print(f"Saved to {output_file}")
+    proxies.print_report()
 
 
-def run(channels_file: str, days_back: int, output_file: str):
+def run(channels_file: str, days_back: int, output_file: str, refresh: bool = False):
     channels = read_channels(channels_file)
-    asyncio.run(check_channels(channels, days_back, output_file))
+    asyncio.run(check_channels(channels, days_back, output_file, refresh))
@@ -1,147 +1,252 @@
 import asyncio
 import datetime
-import random
-import re
-
-import aiohttp
-from aiohttp_socks import ProxyConnector
 
 from models.settings import load_settings
-from models.v2ray_config import CONFIG_PATTERN
-from services import renamer
-from services.read_channels import read_channels
-from services.telegram_web_scraping import (
-    get_message_datetime,
-    get_message_id,
-    get_message_text,
-    load_channel_messages,
+from services.channel_crawler import COMPLETE, NOT_FOUND, RESTRICTED, crawl_channel
+from services.channel_scheduler import ChannelPlan, plan_channels
+from services.channel_status_cache import (
+    HAS_CONFIGS,
+    UNREACHABLE,
+    ChannelStatusCache,
+    unreachable_verdict,
 )
+from services.config_index import FingerprintIndex
+from services.crawl_state import CrawlState
+from services.message_consumers import ConfigCollector
+from services.output_writer import OutputWriter
+from services.parse_date import parse_dates
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.read_channels import read_channels
 
 settings = load_settings("./settings.json")
 
+SKIP_VERDICTS = UNREACHABLE
+
 
 async def collect_channel_configs(
     channel: str,
     cutoff_date: datetime.datetime,
-    session: aiohttp.ClientSession,
+    proxies: ProxyPool,
     semaphore: asyncio.Semaphore,
+    state: CrawlState | None = None,
+    parser: ParseExecutor | None = None,
+    max_pages: int = settings.MAX_PAGES,
+    cache: ChannelStatusCache | None = None,
+    end_date: datetime.datetime | None = None,
+    index: FingerprintIndex | None = None,
+    writer: OutputWriter | None = None,
+    pending_marks: list[tuple[str, int, datetime.datetime]] | None = None,
 ):
-    async with semaphore:
-        delay = random.uniform(1.5, 4.0)
-        await asyncio.sleep(delay)
-
-        channel_configs: set[str] = set()
-
-        last_msg_datetime = datetime.datetime.now(datetime.timezone.utc)
-        next_offset_id = None
-
-        for page_num in range(settings.MAX_PAGES):
-            if last_msg_datetime < cutoff_date:
-                break
-
-            messages = await load_channel_messages(channel, session, next_offset_id)
-
-            if not messages:
-                if page_num == 0:
-                    print(
-                        f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel"
-                    )
-                    return channel_configs
-                else:
-                    break
-
-            for msg in messages:
-                msg_datetime = get_message_datetime(msg)
-
-                if not msg_datetime:
-                    continue
-
-                if msg_datetime < cutoff_date:
-                    if len(channel_configs) > 0:
-                        print(f"✓ {channel:<30} | Found: {len(channel_configs)}")
-                    else:
-                        print(f"- {channel:<30} | Found: 0")
-                    return channel_configs
-
-                msg_text = get_message_text(msg)
-                if msg_text:
-                    found = re.findall(CONFIG_PATTERN, msg_text)
-                    for config in found:
-                        config = config.rstrip(".:,;!?")
-
-                        renamed_config = renamer.rename_config(config, channel)
-                        channel_configs.add(str(renamed_config))
-
-            last_msg_datetime = None
-            next_offset_id = None
-
-            for msg in reversed(messages):
-                p_id = get_message_id(msg)
-                p_date = get_message_datetime(msg)
-
-                if p_id and p_date:
-                    next_offset_id = p_id
-                    last_msg_datetime = p_date
-                    break
-
-            delay = random.uniform(0.5, 1.5)
-            await asyncio.sleep(delay)
-
-            if not last_msg_datetime or not next_offset_id:
-                break
+    """
+    Collects one channel. With `pending_marks`, high-water mark updates are
+    appended there for the caller to apply once the configs are safely
+    handled, instead of being saved to `state` straight away.
+    """
+    collector = ConfigCollector(channel, index, writer)
+
+    stop_at_id = None
+    if state:
+        stop_at_id, _ = state.get_high_water_mark(channel)
+
+    result = await crawl_channel(
+        channel,
+        cutoff_date,
+        proxies,
+        semaphore,
+        [collector],
+        max_pages,
+        stop_at_id=stop_at_id,
+        parser=parser,
+        prefetch=settings.PREFETCH_PAGES,
+        end_date=end_date,
+    )
 
-        count = len(channel_configs)
-        if count > 0:
-            print(f"✓ {channel:<30} | Found: {count}")
-        else:
-            print(f"- {channel:<30} | Found: 0")
+    verdict = unreachable_verdict(result.status)
+    if verdict:
+        if cache:
+            cache.set_verdict(channel, verdict)
+
+        if result.status == RESTRICTED:
+            print(f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel")
+        elif result.status == NOT_FOUND:
+            print(f"✗ {channel:<30} | Channel Not Found (404)")
+        return collector
+
+    # Reposts of servers another channel already claimed still count here
+    found = collector.collected + collector.duplicates
+
+    if cache and found:
+        cache.set_verdict(channel, HAS_CONFIGS)
+
+    if state:
+        # A crawl that stopped early left messages above the old mark unread,
+        # so keep the old mark and read them next run
+        complete = result.status in COMPLETE
+        if complete and result.newest_msg_id and result.newest_msg_datetime:
+            mark = (channel, result.newest_msg_id, result.newest_msg_datetime)
+            if pending_marks is None:
+                state.set_high_water_mark(*mark)
+            else:
+                pending_marks.append(mark)
+
+        state.record_channel_run(
+            channel,
+            result.pages,
+            result.messages,
+            found,
+            result.posting_rate,
+        )
+
+    count = collector.collected
+    duplicates = (
+        f" | Duplicates: {collector.duplicates}" if collector.duplicates else ""
+    )
+    if count > 0:
+        print(f"✓ {channel:<30} | Found: {count}{duplicates}")
+    else:
+        print(f"- {channel:<30} | Found: 0{duplicates}")
 
-        return channel_configs
+    return collector
 
 
 async def collect_all_channels_configs(
-    channels: list[str], hours_back: int, output_file: str
+    channels: list[str],
+    hours_back: int | None,
+    output_file: str,
+    state_file: str | None = None,
+    refresh: bool = False,
+    start_date: datetime.datetime | None = None,
+    end_date: datetime.datetime | None = None,
+    provenance_file: str | None = None,
 ):
-    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
-        hours=hours_back
-    )
+    if start_date:
+        cutoff_date = start_date
+    else:
+        cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            hours=hours_back
+        )
 
     print(f"--- Collecting Configs from {len(channels)} Channels ---")
     print(f"--- Cutoff Date: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
+    if end_date:
+        print(f"--- End Date:    {end_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("")
+    cache = ChannelStatusCache(settings.CHANNEL_STATUS_CACHE, refresh)
+    channels, cached = cache.split_channels(channels, SKIP_VERDICTS)
+    if cached:
+        print(
+            f"--- Skipping {len(cached)} channels with cached verdicts (--refresh to re-check) ---"
+        )
+
+    state = None
+    plans = [ChannelPlan(channel, settings.MAX_PAGES, 0) for channel in channels]
+    if state_file:
+        state = CrawlState(state_file)
+        print(f"--- Incremental: only messages newer than {state_file} ---")
+
+        plans, skipped = plan_channels(channels, state, hours_back, settings.MAX_PAGES)
+        if skipped:
+            print(f"--- Skipping {len(skipped)} barren channels this run ---")
+
+    # Shared by every channel, so each server is written only once
+    index = FingerprintIndex(settings.COMPACT_FINGERPRINTS)
 
-    connector = ProxyConnector.from_url(settings.PROXY_URL)
     sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
 
-    async with aiohttp.ClientSession(connector=connector) as session:
+    async with (
+        ProxyPool(
+            settings.PROXY_URL,
+            settings.REQUESTS_PER_SECOND,
+            settings.MAX_REQUESTS_PER_SECOND,
+        ) as proxies,
+        ParseExecutor(settings.PARSE_WORKERS) as parser,
+        OutputWriter(output_file) as writer,
+    ):
+        # Tasks take the semaphore in creation order, so plans run in order
         tasks = []
-        for channel in channels:
-            task = collect_channel_configs(channel, cutoff_date, session, sem)
+        for plan in plans:
+            task = asyncio.ensure_future(
+                collect_channel_configs(
+                    plan.channel,
+                    cutoff_date,
+                    proxies,
+                    sem,
+                    state,
+                    parser,
+                    plan.max_pages,
+                    cache,
+                    end_date,
+                    index,
+                    writer,
+                )
+            )
             tasks.append(task)
 
         total_configs_found = 0
         channels_with_configs = 0
 
         for future in asyncio.as_completed(tasks):
-            result = await future
+            collector = await future
 
-            if result:
-                count = len(result)
-                total_configs_found += count
+            if collector.collected:
+                total_configs_found += collector.collected
                 channels_with_configs += 1
 
-                with open(output_file, "a", encoding="utf-8") as f:
-                    for config in result:
-                        f.write(config + "\n")
+    if state:
+        state.close()
+    cache.close()
+
+    if provenance_file:
+        index.write_provenance(provenance_file)
 
     print("\nCollection Complete!")
     print(f"   • Channels with configs: {channels_with_configs}")
     print(f"   • Total configs saved:   {total_configs_found}")
+    print(f"   • Duplicates skipped:    {index.duplicates}")
     print(f"   • Saved to:              {output_file}")
+    if provenance_file:
+        print(f"   • Sources saved to:      {provenance_file}")
+    proxies.print_report()
+
+
+def run(
+    channels_file: str,
+    hours_back: int | None,
+    output_file: str,
+    state_file: str | None = None,
+    refresh: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+    provenance_file: str | None = None,
+):
+    start_date = end_date = None
+    if start or end:
+        if not (start and end):
+            print("[!] Error: --start and --end must be given together.")
+            return
+        if state_file:
+            print("[!] Error: --state can't be combined with a --start/--end window.")
+            return
+
+        start_date, end_date = parse_dates(start, end)
+        if start_date >= end_date:
+            print("[!] Error: --start must be before --end.")
+            return
+    elif hours_back is None:
+        print("[!] Error: Pass either --hours-back or a --start/--end window.")
+        return
 
-
-def run(channels_file: str, hours_back: int, output_file: str):
     channels = read_channels(channels_file)
-    asyncio.run(collect_all_channels_configs(channels, hours_back, output_file))
+    asyncio.run(
+        collect_all_channels_configs(
+            channels,
+            hours_back,
+            output_file,
+            state_file,
+            refresh,
+            start_date,
+            end_date,
+            provenance_file,
+        )
+    )
@@ -1,143 +1,69 @@
 import asyncio
 import datetime
-import random
-import re
-
-import aiohttp
-from aiohttp_socks import ProxyConnector
 
 from models.settings import load_settings
-from services.read_channels import read_channels
-from services.telegram_web_scraping import (
-    get_message_datetime,
-    get_message_id,
-    get_message_links,
-    load_channel_messages,
+from services.channel_crawler import NOT_FOUND, RESTRICTED, crawl_channel
+from services.channel_status_cache import (
+    UNREACHABLE,
+    ChannelStatusCache,
+    unreachable_verdict,
 )
+from services.message_consumers import ChannelLinkExtractor
+from services.output_writer import OutputWriter
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.read_channels import read_channels
 
 settings = load_settings("./settings.json")
 
-IGNORE_LIST = {
-    "proxy",
-    "share",
-    "joinchat",
-    "addstickers",
-    "socks",
-    "bot",
-    "media",  # CSS code: @media
-    "import",  # Python/Java code: @import
-    "admin",  # Common text: "Contact @admin" (often not a real username)
-    "support",  # Common text: "Contact @support"
-    "gmail",
-    "yahoo",
-    "hotmail",
-    "protonmail",  # Email domains
-}
+SKIP_VERDICTS = UNREACHABLE
 
 
 async def extract_channel_links(
     channel: str,
     cutoff_date: datetime.datetime,
-    session: aiohttp.ClientSession,
+    proxies: ProxyPool,
     semaphore: asyncio.Semaphore,
     v2ray_channels: set[str],
+    parser: ParseExecutor | None = None,
+    cache: ChannelStatusCache | None = None,
+    writer: OutputWriter | None = None,
 ):
-    async with semaphore:
-        delay = random.uniform(1.5, 4.0)
-        await asyncio.sleep(delay)
-
-        channel_links: set[str] = set()
-
-        last_msg_datetime = datetime.datetime.now(datetime.timezone.utc)
-        next_offset_id = None
-
-        for page_num in range(settings.MAX_PAGES):
-            if last_msg_datetime < cutoff_date:
-                break
-
-            messages = await load_channel_messages(channel, session, next_offset_id)
-
-            if not messages:
-                if page_num == 0:
-                    print(
-                        f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel"
-                    )
-                    return channel_links
-                else:
-                    break
-
-            for msg in messages:
-                msg_datetime = get_message_datetime(msg)
-
-                if not msg_datetime:
-                    continue
-
-                if msg_datetime < cutoff_date:
-                    if len(channel_links) > 0:
-                        print(f"✓ {channel:<30} | Found: {len(channel_links)}")
-                    else:
-                        print(f"- {channel:<30} | Found: 0")
-                    return channel_links
-
-                msg_links = get_message_links(msg)
-                if not msg_links:
-                    continue
-
-                for msg_link in msg_links:
-                    msg_link = (
-                        msg_link.replace("https://", "")
-                        .replace("http://", "")
-                        .replace("www.", "")
-                    )
-
-                    match = re.match(
-                        r"(?:t\.me|telegram\.me)\/(?:s\/)?([a-zA-Z0-9_]{4,})(?:$|[\/\?\#])",
-                        msg_link,
-                    )
-
-                    if match:
-                        username = match.group(1).lower()
-
-                        if username in IGNORE_LIST:
-                            continue
-
-                        if username.endswith("bot"):
-                            continue
-
-                        if username in v2ray_channels:
-                            continue
-
-                        channel_links.add(username)
-
-            last_msg_datetime = None
-            next_offset_id = None
-
-            for msg in reversed(messages):
-                p_id = get_message_id(msg)
-                p_date = get_message_datetime(msg)
-
-                if p_id and p_date:
-                    next_offset_id = p_id
-                    last_msg_datetime = p_date
-                    break
+    extractor = ChannelLinkExtractor(v2ray_channels, writer)
+
+    result = await crawl_channel(
+        channel,
+        cutoff_date,
+        proxies,
+        semaphore,
+        [extractor],
+        settings.MAX_PAGES,
+        parser=parser,
+        prefetch=settings.PREFETCH_PAGES,
+    )
 
-            delay = random.uniform(0.5, 1.5)
-            await asyncio.sleep(delay)
+    verdict = unreachable_verdict(result.status)
+    if verdict:
+        if cache:
+            cache.set_verdict(channel, verdict)
 
-            if not last_msg_datetime or not next_offset_id:
-                break
+        if result.status == RESTRICTED:
+            print(f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel")
+        elif result.status == NOT_FOUND:
+            print(f"✗ {channel:<30} | Channel Not Found (404)")
+        return 0
 
-        count = len(channel_links)
-        if count > 0:
-            print(f"✓ {channel:<30} | Found: {count}")
-        else:
-            print(f"- {channel:<30} | Found: 0")
+    count = len(extractor.links)
+    if count > 0:
+        print(f"✓ {channel:<30} | Found: {count}")
+    else:
+        print(f"- {channel:<30} | Found: 0")
 
-        return channel_links
+    return count
 
 
 async def extract_all_channels_links(
-    channels: set[str], days_back: int, output_file: str
+    channels: set[str], days_back: int, output_file: str, refresh: bool = False
 ):
     cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
         days=days_back
@@ -146,39 +72,50 @@ async def extract_all_channels_links(
     print(f"--- Extracting channel links from {len(channels)} Channels ---")
     print(f"--- Cutoff Date: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("")
+    cache = ChannelStatusCache(settings.CHANNEL_STATUS_CACHE, refresh)
+    to_crawl, cached = cache.split_channels(list(channels), SKIP_VERDICTS)
+    if cached:
+        print(
+            f"--- Skipping {len(cached)} channels with cached verdicts (--refresh to re-check) ---"
+        )
 
-    connector = ProxyConnector.from_url(settings.PROXY_URL)
     sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
 
-    async with aiohttp.ClientSession(connector=connector) as session:
+    async with (
+        ProxyPool(
+            settings.PROXY_URL,
+            settings.REQUESTS_PER_SECOND,
+            settings.MAX_REQUESTS_PER_SECOND,
+        ) as proxies,
+        ParseExecutor(settings.PARSE_WORKERS) as parser,
+        OutputWriter(output_file) as writer,
+    ):
         tasks = []
-        for channel in channels:
-            task = extract_channel_links(channel, cutoff_date, session, sem, channels)
+        for channel in to_crawl:
+            task = extract_channel_links(
+                channel, cutoff_date, proxies, sem, channels, parser, cache, writer
+            )
             tasks.append(task)
 
         total_configs_found = 0
         channels_with_configs = 0
 
         for future in asyncio.as_completed(tasks):
-            result = await future
+            count = await future
 
-            if result:
-                count = len(result)
+            if count:
                 total_configs_found += count
                 channels_with_configs += 1
 
-                with open(output_file, "a", encoding="utf-8") as f:
-                    for config in result:
-                        f.write(config + "\n")
+    cache.close()
 
     print("\nExtraction Complete!")
     print(f"   • Channels with channel links: {channels_with_configs}")
     print(f"   • Total channel links saved:   {total_configs_found}")
     print(f"   • Saved to:                    {output_file}")
+    proxies.print_report()
 
 
-def run(channels_file: str, days_back: int, output_file: str):
+def run(channels_file: str, days_back: int, output_file: str, refresh: bool = False):
     channels = set(read_channels(channels_file))
-    asyncio.run(extract_all_channels_links(channels, days_back, output_file))
+    asyncio.run(extract_all_channels_links(channels, days_back, output_file, refresh))
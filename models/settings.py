@@ -2,7 +2,7 @@ from pydantic import BaseModel, ValidationError
 
 
 class Settings(BaseModel):
-    PROXY_URL: str
+    PROXY_URL: str | list[str]  # One or more upstream proxies for scraping
     MAX_CONCURRENT_SCANS: int
     MAX_PAGES: int
     CORE_PATH: str
@@ -10,8 +10,23 @@ class Settings(BaseModel):
     TEST_URL: str
     TIMEOUT: int
     BATCH_SIZE: int  # Pydantic will auto-convert "500" -> 500
-    MAX_WORKERS: int
+    MAX_WORKERS: int  # Pings in flight at once during a batch
     MAX_RETRIES: int
+    CORE_SHARDS: int = 1  # Cores testing batches side by side, each on its own ports
+    BOOT_AHEAD: bool = (
+        True  # Boot each core's next batch while the current one is probed
+    )
+    PARSE_WORKERS: int = 0  # 0 parses pages on the event loop
+    PREFETCH_PAGES: int = 1  # Pages fetched concurrently per channel, 1 is sequential
+    REQUESTS_PER_SECOND: float = 2.0  # Starting rate of the adaptive limiter
+    MAX_REQUESTS_PER_SECOND: float = 20.0
+    CHANNEL_STATUS_CACHE: str = "./channel_status.db"
+    FINGERPRINT_INDEX: str = "./fingerprints.db"
+    COMPACT_FINGERPRINTS: bool = False  # Key dedupe by 16-byte digests
+    PARSE_CACHE: str = "./parse_cache.db"
+    PARSE_CACHE_SIZE: int = 1_000_000  # Links kept, least recently used are evicted
+    PIPELINE_QUEUE_SIZE: int = 1000  # Configs buffered between pipeline stages
+    PIPELINE_FLUSH_SECONDS: float = 10.0  # Ping a partial batch after this idle time
 
 
 def load_settings(file_path: str):
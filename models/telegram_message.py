@@ -0,0 +1,30 @@
+import datetime
+
+
+class MessageRecord:
+    """Compact, picklable view of one t.me/s message."""
+
+    __slots__ = ("id", "datetime", "text", "links", "forwarded_from", "configs")
+
+    id: int | None
+    datetime: datetime.datetime | None
+    text: str | None
+    links: list[str]
+    forwarded_from: str | None
+    configs: list[str]
+
+    def __init__(
+        self,
+        id: int | None = None,
+        datetime: datetime.datetime | None = None,
+        text: str | None = None,
+        links: list[str] | None = None,
+        forwarded_from: str | None = None,
+    ) -> None:
+        self.id = id
+        self.datetime = datetime
+        self.text = text
+        self.links = links if links is not None else []
+        self.forwarded_from = forwarded_from
+        # Filled in by the parse executor
+        self.configs = []
@@ -1,12 +1,207 @@
 from typing import Any
+from urllib.parse import ParseResult, parse_qs, urlparse
+
+from services import fingerprint, parse_config_link, renamer
 
 CONFIG_PATTERN = r"(?:vmess|vless|trojan|ss|tuic|hysteria2?)://[a-zA-Z0-9\-_@.:?=&%#]+"
 
 
 class V2rayConfig:
+    """
+    One config link, decoded once: the JSON of a VMess link or the parsed
+    URI of any other. The fingerprint, the renamed link and the sing-box
+    outbound are all built from that decoded form on first use and cached.
+
+    `channel` records where the config was found. The link itself stays
+    as posted until `export_link`, so the remark rewrite only happens for
+    configs that are actually written out.
+
+    Slots instead of a `__dict__` keep the many thousands of configs a run
+    holds small; a slot that was never computed, or was released, is
+    simply unset.
+    """
+
+    __slots__ = (
+        "link",
+        "channel",
+        "vmess_data",
+        "url",
+        "query",
+        "cached_fingerprint",
+        "cached_outbound",
+    )
+
     link: str
-    parsed_data: dict[str, Any]
+    channel: str | None
+    vmess_data: dict[str, Any] | None
+    url: ParseResult | None
+    query: dict[str, list[str]]
+    cached_fingerprint: str | None
+    cached_outbound: dict[str, Any]
+
+    def __init__(
+        self,
+        link: str,
+        outbound: dict[str, Any] | None = None,
+        channel: str | None = None,
+    ) -> None:
+        self.link = link.strip()
+        self.channel = channel
+        if outbound is not None:
+            self.cached_outbound = outbound
+
+    @property
+    def is_vmess(self):
+        return self.link.startswith("vmess://")
+
+    def decoded_vmess(self):
+        """The VMess JSON, None if the link doesn't decode."""
+        try:
+            return self.vmess_data
+        except AttributeError:
+            pass
+
+        try:
+            self.vmess_data = parse_config_link.decode_vmess(self.link)
+        except ValueError:
+            self.vmess_data = None
+        return self.vmess_data
+
+    def parsed_url(self):
+        """The parsed URI and query params, (None, {}) if it doesn't parse."""
+        try:
+            return self.url, self.query
+        except AttributeError:
+            pass
+
+        try:
+            self.url = urlparse(self.link)
+            self.query = parse_qs(self.url.query)
+        except ValueError:
+            self.url, self.query = None, {}
+        return self.url, self.query
+
+    @property
+    def fingerprint(self):
+        """
+        Same as `fingerprint.generate_fingerprint` of the link, None for
+        invalid configs.
+        """
+        try:
+            return self.cached_fingerprint
+        except AttributeError:
+            self.cached_fingerprint = self.build_fingerprint()
+            return self.cached_fingerprint
+
+    @property
+    def digest(self):
+        """The compact form of the fingerprint (see `fingerprint`)."""
+        fgp = self.fingerprint
+        return fingerprint.digest_fingerprint(fgp) if fgp else None
+
+    def build_fingerprint(self):
+        if self.is_vmess:
+            data = self.decoded_vmess()
+            if not data:
+                # The outbound needs strict UTF-8, fingerprints ignore bad bytes
+                return fingerprint.get_vmess_fingerprint(self.link)
+            try:
+                return fingerprint.vmess_fingerprint(data)
+            except Exception:
+                return None
+
+        if self.link.startswith("ss://"):
+            return fingerprint.get_ss_fingerprint(self.link)
+
+        if self.link.startswith(("vless://", "trojan://", "tuic://", "hysteria")):
+            parsed, query = self.parsed_url()
+            try:
+                return fingerprint.url_fingerprint(parsed, query)
+            except Exception:
+                return None
+
+        # Fallback: if we don't know the protocol, just use the link itself
+        return self.link
+
+    @property
+    def outbound(self):
+        """
+        The sing-box outbound of the link. Raises ValueError for links
+        that can't be parsed. Later changes to the dict, like the tag
+        set by `generate_mass_config`, are kept.
+        """
+        try:
+            return self.cached_outbound
+        except AttributeError:
+            pass
+
+        self.cached_outbound = self.build_outbound()
+        # The outbound is the last thing built from the decoded form; configs
+        # waiting to be tested shouldn't hold both.
+        self.release_decoded()
+        return self.cached_outbound
+
+    def release_decoded(self):
+        """Drops the decoded form; it's decoded again if needed."""
+        for slot in ("vmess_data", "url", "query"):
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                pass
+
+    def build_outbound(self):
+        if self.is_vmess:
+            data = self.decoded_vmess()
+            if data is None:
+                raise ValueError("Invalid VMess base64")
+            return parse_config_link.vmess_outbound(data)
+
+        if self.link.startswith("ss://"):
+            return parse_config_link.parse_shadowsocks(self.link)
+
+        protocol = parse_config_link.uri_protocol(self.link)
+        if protocol:
+            parsed, query = self.parsed_url()
+            if parsed is None:
+                raise ValueError("Invalid URI")
+            return parse_config_link.uri_outbound(parsed, query, protocol)
+
+        raise ValueError("Unsupported protocol")
+
+    def renamed(self, channel_name: str):
+        """
+        The config with the channel name put in front of its remark, like
+        `renamer.rename_config`. The copy reuses this config's decoded form
+        and fingerprint, which the remark isn't part of.
+        """
+        clean_name = renamer.clean_channel_name(channel_name)
+
+        if self.is_vmess:
+            data = self.decoded_vmess()
+            if data is None:
+                return self  # If fails, keep original
+            link, data = renamer.rename_vmess_data(data, clean_name)
+            renamed = V2rayConfig(link)
+            renamed.vmess_data = data
+        else:
+            parsed, query = self.parsed_url()
+            if parsed is None:
+                return self
+            link, parsed = renamer.rename_parsed_url(parsed, clean_name)
+            renamed = V2rayConfig(link)
+            renamed.url, renamed.query = parsed, query
+
+        # Unless the fingerprint falls back to the whole link, remark included
+        if self.fingerprint != self.link:
+            renamed.cached_fingerprint = self.fingerprint
+        return renamed
+
+    @property
+    def export_link(self):
+        """The link renamed after its channel, for output files."""
+        if not self.channel:
+            return self.link
+        return self.renamed(self.channel).link
 
-    def __init__(self, link: str, parsed_data: dict[str, Any]) -> None:
-        self.link = link
-        self.parsed_data = parsed_data
+    def __repr__(self):
+        return f"V2rayConfig({self.link!r})"
@@ -0,0 +1,295 @@
+import asyncio
+import datetime
+import time
+from collections import Counter
+from pathlib import Path
+
+import test_latency
+from collect_configs import SKIP_VERDICTS, collect_channel_configs
+from models.settings import load_settings
+from models.v2ray_config import V2rayConfig
+from services.channel_scheduler import ChannelPlan, plan_channels
+from services.channel_status_cache import ChannelStatusCache
+from services.config_filter import rejection_reason
+from services.config_index import FingerprintIndex
+from services.crawl_state import CrawlState
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.read_channels import read_channels
+
+settings = load_settings("./settings.json")
+
+
+class PipelineStats:
+    started_at: float
+    collected: int
+    supported: int
+    tested: int
+    active: int
+    first_active_after: float | None
+    rejections: Counter[str]
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.collected = 0
+        self.supported = 0
+        self.tested = 0
+        self.active = 0
+        self.first_active_after = None
+        self.rejections = Counter()
+
+
+async def scrape_stage(
+    plans: list[ChannelPlan],
+    cutoff_date: datetime.datetime,
+    proxies: ProxyPool,
+    parser: ParseExecutor,
+    state: CrawlState | None,
+    cache: ChannelStatusCache,
+    index: FingerprintIndex,
+    configs_queue: asyncio.Queue,
+    stats: PipelineStats,
+    pending_marks: list[tuple[str, int, datetime.datetime]],
+):
+    """
+    Collects channels and hands each channel's configs on as soon as it's
+    done. Servers are deduplicated across channels by the shared index.
+    High-water marks go to `pending_marks`, as the configs are still queued.
+    """
+    sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
+
+    async def collect_into_queue(plan: ChannelPlan):
+        collector = await collect_channel_configs(
+            plan.channel,
+            cutoff_date,
+            proxies,
+            sem,
+            state,
+            parser,
+            plan.max_pages,
+            cache,
+            index=index,
+            pending_marks=pending_marks,
+        )
+        stats.collected += collector.collected
+        for config in collector.configs:
+            await configs_queue.put(config)
+
+    # Tasks take the semaphore in creation order, so plans run in order
+    await asyncio.gather(*(collect_into_queue(plan) for plan in plans))
+    await configs_queue.put(None)
+
+
+async def parse_stage(
+    configs_queue: asyncio.Queue, ping_queue: asyncio.Queue, stats: PipelineStats
+):
+    """
+    Builds the sing-box outbounds of collected configs, dropping unsupported
+    ones. Configs arrive already decoded by the collector, so this only
+    turns that decoded form into outbounds.
+    """
+    while (config := await configs_queue.get()) is not None:
+        reason = rejection_reason(config)
+        if reason:
+            stats.rejections[reason] += 1
+            continue
+
+        stats.supported += 1
+        await ping_queue.put(config)
+
+    await ping_queue.put(None)
+
+
+async def ping_stage(
+    ping_queue: asyncio.Queue,
+    output_file: str,
+    output_result_file: str,
+    stats: PipelineStats,
+):
+    """
+    Pings configs in batches. A batch starts as soon as it is full, or when
+    no new config arrived for PIPELINE_FLUSH_SECONDS. Failed configs are
+    retried in later batches, up to MAX_RETRIES attempts each.
+    """
+    pending: list[V2rayConfig] = []
+    attempts: dict[str, int] = {}
+    upstream_done = False
+    batch_num = 0
+
+    while not upstream_done or pending:
+        deadline = time.monotonic() + settings.PIPELINE_FLUSH_SECONDS
+        while not upstream_done and len(pending) < settings.BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+
+            try:
+                v2ray_config = await asyncio.wait_for(ping_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if v2ray_config is None:
+                upstream_done = True
+            else:
+                pending.append(v2ray_config)
+
+        if not pending:
+            continue
+
+        batch = pending[: settings.BATCH_SIZE]
+        pending = pending[settings.BATCH_SIZE :]
+        batch_num += 1
+
+        print(f"\nProcessing Batch {batch_num} ({len(batch)} configs)...")
+        # The core and its ping threads block, so keep them off the event loop
+        results = await asyncio.to_thread(test_latency.run_batch, batch, batch_num)
+
+        active_in_batch = [r for r in results if r["status"] == "success"]
+        active_links_set = {r["config"] for r in active_in_batch}
+
+        # Only configs that made it into the output get renamed
+        by_link = {v2ray_config.link: v2ray_config for v2ray_config in batch}
+        test_latency.save_active_results(
+            [
+                {**r, "config": by_link[r["config"]].export_link}
+                for r in active_in_batch
+            ],
+            output_file,
+            output_result_file,
+        )
+
+        stats.tested += len(batch)
+        stats.active += len(active_in_batch)
+        if active_in_batch and stats.first_active_after is None:
+            stats.first_active_after = time.monotonic() - stats.started_at
+
+        print(f"   Batch {batch_num} Done: {len(active_in_batch)} active.")
+
+        for v2ray_config in batch:
+            if v2ray_config.link in active_links_set:
+                continue
+
+            attempts[v2ray_config.link] = attempts.get(v2ray_config.link, 0) + 1
+            if attempts[v2ray_config.link] < settings.MAX_RETRIES:
+                pending.append(v2ray_config)
+
+
+async def run_pipeline(
+    channels: list[str],
+    hours_back: int,
+    output_file: str,
+    output_result_file: str,
+    state_file: str | None = None,
+    refresh: bool = False,
+):
+    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        hours=hours_back
+    )
+
+    print(
+        f"--- Pipeline: Collecting and Testing Configs from {len(channels)} Channels ---"
+    )
+    print(f"--- Cutoff Date: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
+
+    cache = ChannelStatusCache(settings.CHANNEL_STATUS_CACHE, refresh)
+    channels, cached = cache.split_channels(channels, SKIP_VERDICTS)
+    if cached:
+        print(
+            f"--- Skipping {len(cached)} channels with cached verdicts (--refresh to re-check) ---"
+        )
+
+    state = None
+    plans = [ChannelPlan(channel, settings.MAX_PAGES, 0) for channel in channels]
+    if state_file:
+        state = CrawlState(state_file)
+        print(f"--- Incremental: only messages newer than {state_file} ---")
+
+        plans, skipped = plan_channels(channels, state, hours_back, settings.MAX_PAGES)
+        if skipped:
+            print(f"--- Skipping {len(skipped)} barren channels this run ---")
+
+    test_latency.init_result_files(output_file, output_result_file)
+
+    # Bounded queues: a slow stage holds back the ones before it
+    configs_queue = asyncio.Queue(settings.PIPELINE_QUEUE_SIZE)
+    ping_queue = asyncio.Queue(settings.PIPELINE_QUEUE_SIZE)
+    index = FingerprintIndex(settings.COMPACT_FINGERPRINTS)
+    stats = PipelineStats()
+    pending_marks: list[tuple[str, int, datetime.datetime]] = []
+
+    async with (
+        ProxyPool(
+            settings.PROXY_URL,
+            settings.REQUESTS_PER_SECOND,
+            settings.MAX_REQUESTS_PER_SECOND,
+        ) as proxies,
+        ParseExecutor(settings.PARSE_WORKERS) as parser,
+    ):
+        await asyncio.gather(
+            scrape_stage(
+                plans,
+                cutoff_date,
+                proxies,
+                parser,
+                state,
+                cache,
+                index,
+                configs_queue,
+                stats,
+                pending_marks,
+            ),
+            parse_stage(configs_queue, ping_queue, stats),
+            ping_stage(ping_queue, output_file, output_result_file, stats),
+        )
+
+    if state:
+        # Only now that every collected config has been pinged; an interrupted
+        # run keeps the old marks and collects those configs again
+        for mark in pending_marks:
+            state.set_high_water_mark(*mark)
+        state.close()
+    cache.close()
+
+    test_latency.sort_result_file(output_result_file)
+
+    elapsed = time.monotonic() - stats.started_at
+    first_active = (
+        f"{stats.first_active_after:.1f}s"
+        if stats.first_active_after is not None
+        else "-"
+    )
+
+    print("\n" + "=" * 40)
+    print("Pipeline Complete.")
+    print(f"   Collected:       {stats.collected}")
+    print(f"   Duplicates:      {index.duplicates}")
+    print(f"   Supported:       {stats.supported}")
+    print(f"   Total Tested:    {stats.tested}")
+    print(f"   Total Active:    {stats.active}")
+    print(f"   First active in: {first_active}")
+    print(f"   Total time:      {elapsed:.1f}s")
+    print(f"   Saved to: {output_file}")
+    print(f"             {output_result_file}")
+    print("=" * 40)
+    test_latency.print_rejections(stats.rejections)
+    proxies.print_report()
+
+
+def run(
+    channels_file: str,
+    hours_back: int,
+    output_file: str,
+    output_result_file: str,
+    state_file: str | None = None,
+    refresh: bool = False,
+):
+    if not Path(settings.CORE_PATH).exists():
+        print(f"Core not found at: {settings.CORE_PATH}")
+        return
+
+    channels = read_channels(channels_file)
+    asyncio.run(
+        run_pipeline(
+            channels, hours_back, output_file, output_result_file, state_file, refresh
+        )
+    )
@@ -7,7 +7,9 @@ import check_channels
 import clean_channel_list
 import collect_configs
 import extract_channels
+import pipeline
 import remove_duplicate_configs
+import scan_channels
 import test_latency
 
 
@@ -20,6 +22,11 @@ def main():
         "collect", help="Collect configs from telegram channels"
     )
 
+    collect_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached channel verdicts and re-check every channel",
+    )
     collect_parser.add_argument(
         "--channels",
         required=True,
@@ -27,11 +34,31 @@ def main():
         help="Path of the channels file",
     )
     collect_parser.add_argument(
-        "--hours-back", required=True, type=int, help="Number of hours to go back"
+        "--hours-back", type=int, help="Number of hours to go back"
+    )
+    collect_parser.add_argument(
+        "--start",
+        type=str,
+        help="Start of the window to collect (Tehran time, YYYY-MM-DD-HH:MM)",
+    )
+    collect_parser.add_argument(
+        "--end",
+        type=str,
+        help="End of the window to collect (Tehran time, YYYY-MM-DD-HH:MM)",
+    )
+    collect_parser.add_argument(
+        "--provenance",
+        type=str,
+        help="Path to save every collected config with the channels that posted it",
     )
     collect_parser.add_argument(
         "--output", required=True, type=str, help="Path for the output file"
     )
+    collect_parser.add_argument(
+        "--state",
+        type=str,
+        help="Path of the crawl state database, only collect messages newer than the last run",
+    )
 
     clean_configs_parser = subparsers.add_parser(
         "clean-configs", help="Clean configs, remove duplicates"
@@ -49,6 +76,27 @@ def main():
         type=str,
         help="Path to save cleaned configs",
     )
+    clean_configs_parser.add_argument(
+        "--index",
+        type=str,
+        help="Path of the fingerprint index shared across runs (default: FINGERPRINT_INDEX)",
+    )
+    clean_configs_parser.add_argument(
+        "--since-last-run",
+        action="store_true",
+        help="Only output configs whose server isn't in the fingerprint index yet",
+    )
+    clean_configs_parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Dedupe through on-disk buckets, for files larger than RAM",
+    )
+    clean_configs_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes computing fingerprints",
+    )
 
     ping_parser = subparsers.add_parser("ping", help="Test configs latency")
 
@@ -72,11 +120,27 @@ def main():
         type=str,
         help="Path to save test results",
     )
+    ping_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes parsing and validating configs",
+    )
+    ping_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-parse every link instead of using the parse cache",
+    )
 
     extract_parser = subparsers.add_parser(
         "extract", help="Extract channels link from telegram channels"
     )
 
+    extract_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached channel verdicts and re-check every channel",
+    )
     extract_parser.add_argument(
         "--channels",
         required=True,
@@ -94,6 +158,11 @@ def main():
         "check", help="Verify if the provided channels contain V2Ray configurations."
     )
 
+    check_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached channel verdicts and re-check every channel",
+    )
     check_parser.add_argument(
         "--channels",
         required=True,
@@ -125,20 +194,124 @@ def main():
         help="Path to save cleaned channels list",
     )
 
+    scan_parser = subparsers.add_parser(
+        "scan",
+        help="Collect configs, extract channel links and check channels in one crawl",
+    )
+
+    scan_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached channel verdicts and re-check every channel",
+    )
+    scan_parser.add_argument(
+        "--channels",
+        required=True,
+        type=str,
+        help="Path of the channels file",
+    )
+    scan_parser.add_argument(
+        "--hours-back", required=True, type=int, help="Number of hours to go back"
+    )
+    scan_parser.add_argument(
+        "--configs-output", type=str, help="Path to save collected configs"
+    )
+    scan_parser.add_argument(
+        "--links-output", type=str, help="Path to save extracted channel links"
+    )
+    scan_parser.add_argument(
+        "--verified-output",
+        type=str,
+        help="Path to save channels that contain V2Ray configurations",
+    )
+
+    pipeline_parser = subparsers.add_parser(
+        "pipeline",
+        help="Collect, clean and ping configs as one streaming pipeline",
+    )
+
+    pipeline_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached channel verdicts and re-check every channel",
+    )
+    pipeline_parser.add_argument(
+        "--channels",
+        required=True,
+        type=str,
+        help="Path of the channels file",
+    )
+    pipeline_parser.add_argument(
+        "--hours-back", required=True, type=int, help="Number of hours to go back"
+    )
+    pipeline_parser.add_argument(
+        "--output",
+        required=True,
+        type=str,
+        help="Path for the valid configs output file",
+    )
+    pipeline_parser.add_argument(
+        "--result",
+        required=True,
+        type=str,
+        help="Path for the result csv output file",
+    )
+    pipeline_parser.add_argument(
+        "--state",
+        type=str,
+        help="Path of the crawl state database, only collect messages newer than the last run",
+    )
+
     args = parser.parse_args()
 
     if args.command == "collect":
-        collect_configs.run(args.channels, args.hours_back, args.output)
+        collect_configs.run(
+            args.channels,
+            args.hours_back,
+            args.output,
+            args.state,
+            args.refresh,
+            args.start,
+            args.end,
+            args.provenance,
+        )
     elif args.command == "clean-configs":
-        remove_duplicate_configs.run(args.configs, args.output)
+        remove_duplicate_configs.run(
+            args.configs,
+            args.output,
+            args.index,
+            args.since_last_run,
+            args.streaming,
+            args.workers,
+        )
     elif args.command == "ping":
-        test_latency.run(args.configs, args.output, args.result)
+        test_latency.run(
+            args.configs, args.output, args.result, args.workers, args.refresh
+        )
     elif args.command == "extract":
-        extract_channels.run(args.channels, args.days_back, args.output)
+        extract_channels.run(args.channels, args.days_back, args.output, args.refresh)
     elif args.command == "check":
-        check_channels.run(args.channels, args.days_back, args.output)
+        check_channels.run(args.channels, args.days_back, args.output, args.refresh)
     elif args.command == "clean-channels":
         clean_channel_list.run(args.channels, args.output)
+    elif args.command == "scan":
+        scan_channels.run(
+            args.channels,
+            args.hours_back,
+            args.configs_output,
+            args.links_output,
+            args.verified_output,
+            args.refresh,
+        )
+    elif args.command == "pipeline":
+        pipeline.run(
+            args.channels,
+            args.hours_back,
+            args.output,
+            args.result,
+            args.state,
+            args.refresh,
+        )
 
 
 init(autoreset=True)
@@ -1,13 +1,59 @@
-from services import fingerprint
+import sys
+import time
+
+from models.settings import load_settings
+from services import bucket_dedupe, renamer
+from services.fingerprint_pool import fingerprint_configs
+from services.fingerprint_store import FingerprintStore
 from services.read_configs import read_configs
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+settings = load_settings("./settings.json")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_report(initial_count: int, unique_count: int, elapsed: float):
+    duplicates_count = initial_count - unique_count
+    throughput = initial_count / elapsed if elapsed > 0 else 0
+    peak_rss = peak_rss_mb()
+    peak_rss = f"{peak_rss:.0f} MB" if peak_rss is not None else "-"
+
+    print(
+        f"➤ Deduplication Report: Processed {initial_count} configs. Kept {unique_count} unique. Removed {duplicates_count} duplicates. ({throughput:.0f} configs/s, peak RSS {peak_rss})"
+    )
 
-def remove_duplicates(configs: list[str]):
-    unique_configs = {}
 
-    for config in configs:
-        fgp = fingerprint.generate_fingerprint(config)
+def print_index_report(unique_count: int, kept_count: int):
+    print(
+        f"➤ Index Report: {unique_count - kept_count} seen in earlier runs. Kept {kept_count} new."
+    )
+
 
+def remove_duplicates(
+    configs: list[str],
+    store: FingerprintStore | None = None,
+    since_last_run: bool = False,
+    workers: int = 1,
+    compact: bool = False,
+):
+    started_at = time.perf_counter()
+    unique_configs = {}
+    sources: dict[str, set[str]] = {}
+
+    # Fingerprints come back in input order, so the first occurrence wins
+    for config, fgp in fingerprint_configs(configs, workers, compact):
         if not fgp:
             continue  # Skip invalid configs
 
@@ -15,24 +61,66 @@ def remove_duplicates(configs: list[str]):
         if fgp not in unique_configs:
             unique_configs[fgp] = config
 
-    # Calculate stats
-    initial_count = len(configs)
-    unique_count = len(unique_configs)
-    duplicates_count = initial_count - unique_count
+        if store:
+            channels = sources.setdefault(fgp, set())
+            channel = renamer.get_channel_name(config)
+            if channel:
+                channels.add(channel)
 
-    print(
-        f"➤ Deduplication Report: Processed {initial_count} configs. Kept {unique_count} unique. Removed {duplicates_count} duplicates."
-    )
+    print_report(len(configs), len(unique_configs), time.perf_counter() - started_at)
+
+    if store:
+        known = store.known_fingerprints(unique_configs)
+        store.record_seen(sources)
+
+        if since_last_run:
+            unique_count = len(unique_configs)
+            unique_configs = {
+                fgp: config
+                for fgp, config in unique_configs.items()
+                if fgp not in known
+            }
+            print_index_report(unique_count, len(unique_configs))
 
     return list(unique_configs.values())
 
 
-def run(configs_file: str, output_file: str):
-    configs = read_configs(configs_file)
-    unique_configs = remove_duplicates(configs)
+def run(
+    configs_file: str,
+    output_file: str,
+    index_file: str | None = None,
+    since_last_run: bool = False,
+    streaming: bool = False,
+    workers: int = 1,
+):
+    store = None
+    if index_file or since_last_run:
+        store = FingerprintStore(index_file or settings.FINGERPRINT_INDEX)
+
+    if streaming:
+        started_at = time.perf_counter()
+        processed, unique_count, kept_count = bucket_dedupe.dedupe_file(
+            configs_file,
+            output_file,
+            store,
+            since_last_run,
+            workers,
+            settings.COMPACT_FINGERPRINTS,
+        )
+        print_report(processed, unique_count, time.perf_counter() - started_at)
+        if since_last_run:
+            print_index_report(unique_count, kept_count)
+    else:
+        configs = read_configs(configs_file)
+        unique_configs = remove_duplicates(
+            configs, store, since_last_run, workers, settings.COMPACT_FINGERPRINTS
+        )
+
+        with open(output_file, "w", encoding="utf-8") as f:
+            for config in unique_configs:
+                f.write(config + "\n")
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        for config in unique_configs:
-            f.write(config + "\n")
+    if store:
+        store.close()
 
     print(f"saved to {output_file}")
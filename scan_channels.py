@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import datetime
+
+from models.settings import load_settings
+from services.channel_crawler import (
+    NOT_FOUND,
+    RESTRICTED,
+    MessageConsumer,
+    crawl_channel,
+)
+from services.channel_status_cache import (
+    HAS_CONFIGS,
+    NO_CONFIGS,
+    UNREACHABLE,
+    ChannelStatusCache,
+    checked_since,
+    is_conclusive,
+    unreachable_verdict,
+)
+from services.config_index import FingerprintIndex
+from services.message_consumers import (
+    ChannelLinkExtractor,
+    ConfigCollector,
+    ConfigDetector,
+)
+from services.output_writer import OutputWriter
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.read_channels import read_channels
+
+settings = load_settings("./settings.json")
+
+SKIP_VERDICTS = UNREACHABLE
+
+
+async def scan_channel(
+    channel: str,
+    cutoff_date: datetime.datetime,
+    proxies: ProxyPool,
+    semaphore: asyncio.Semaphore,
+    v2ray_channels: set[str],
+    configs_writer: OutputWriter | None,
+    links_writer: OutputWriter | None,
+    check: bool,
+    parser: ParseExecutor | None = None,
+    cache: ChannelStatusCache | None = None,
+    index: FingerprintIndex | None = None,
+):
+    """
+    Crawls the channel once and feeds every page to all requested consumers.
+    Configs and links are written out as they are found.
+    """
+    collector = (
+        ConfigCollector(channel, index, configs_writer) if configs_writer else None
+    )
+    extractor = (
+        ChannelLinkExtractor(v2ray_channels, links_writer) if links_writer else None
+    )
+    detector = ConfigDetector() if check else None
+
+    consumers: list[MessageConsumer] = [
+        c for c in (collector, extractor, detector) if c is not None
+    ]
+
+    result = await crawl_channel(
+        channel,
+        cutoff_date,
+        proxies,
+        semaphore,
+        consumers,
+        settings.MAX_PAGES,
+        parser=parser,
+        prefetch=settings.PREFETCH_PAGES,
+    )
+
+    configs = collector.collected if collector else 0
+    duplicates = collector.duplicates if collector else 0
+    links = len(extractor.links) if extractor else 0
+    verified = bool(detector and detector.found)
+
+    if cache:
+        verdict = unreachable_verdict(result.status)
+        if verdict is None and (configs or duplicates or verified):
+            verdict = HAS_CONFIGS
+        elif verdict is None and detector and is_conclusive(result.status):
+            verdict = NO_CONFIGS
+
+        if verdict == NO_CONFIGS:
+            cache.set_verdict(channel, verdict, checked_since(result, cutoff_date))
+        elif verdict:
+            cache.set_verdict(channel, verdict)
+
+    if result.status == RESTRICTED:
+        print(f"✗ {channel:<30} | Restricted (No Web Preview) or Private Channel")
+    elif result.status == NOT_FOUND:
+        print(f"✗ {channel:<30} | Channel Not Found (404)")
+    elif configs or links or verified:
+        print(
+            f"✓ {channel:<30} | Configs: {configs} | Links: {links}"
+            + (" | Verified" if verified else "")
+        )
+    else:
+        print(f"- {channel:<30} | Found: 0")
+
+    return channel, configs, links, verified
+
+
+async def scan_all_channels(
+    channels: list[str],
+    hours_back: int,
+    configs_output: str | None,
+    links_output: str | None,
+    verified_output: str | None,
+    refresh: bool = False,
+):
+    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        hours=hours_back
+    )
+
+    print(f"--- Scanning {len(channels)} Channels ---")
+    print(f"--- Cutoff Date: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S UTC')} ---")
+
+    v2ray_channels = set(channels)
+
+    cache = ChannelStatusCache(settings.CHANNEL_STATUS_CACHE, refresh)
+    channels, cached = cache.split_channels(channels, SKIP_VERDICTS)
+    if cached:
+        print(
+            f"--- Skipping {len(cached)} channels with cached verdicts (--refresh to re-check) ---"
+        )
+
+    index = FingerprintIndex(settings.COMPACT_FINGERPRINTS)
+    sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SCANS)
+
+    async with (
+        ProxyPool(
+            settings.PROXY_URL,
+            settings.REQUESTS_PER_SECOND,
+            settings.MAX_REQUESTS_PER_SECOND,
+        ) as proxies,
+        ParseExecutor(settings.PARSE_WORKERS) as parser,
+        contextlib.AsyncExitStack() as writers,
+    ):
+        configs_writer, links_writer, verified_writer = [
+            await writers.enter_async_context(OutputWriter(p)) if p else None
+            for p in (configs_output, links_output, verified_output)
+        ]
+
+        tasks = []
+        for channel in channels:
+            task = scan_channel(
+                channel,
+                cutoff_date,
+                proxies,
+                sem,
+                v2ray_channels,
+                configs_writer,
+                links_writer,
+                check=verified_writer is not None,
+                parser=parser,
+                cache=cache,
+                index=index,
+            )
+            tasks.append(task)
+
+        total_configs_found = 0
+        total_links_found = 0
+        verified_count = 0
+
+        for future in asyncio.as_completed(tasks):
+            channel, configs, links, verified = await future
+
+            total_configs_found += configs
+            total_links_found += links
+
+            if verified and verified_writer:
+                verified_count += 1
+                verified_writer.write(channel)
+
+    cache.close()
+
+    print("\nScan Complete!")
+    if configs_output:
+        print(f"   • Configs saved:          {total_configs_found} -> {configs_output}")
+    if links_output:
+        print(f"   • Channel links saved:    {total_links_found} -> {links_output}")
+    if verified_output:
+        print(f"   • Verified channels:      {verified_count} -> {verified_output}")
+    proxies.print_report()
+
+
+def run(
+    channels_file: str,
+    hours_back: int,
+    configs_output: str | None,
+    links_output: str | None,
+    verified_output: str | None,
+    refresh: bool = False,
+):
+    if not (configs_output or links_output or verified_output):
+        print("[!] Error: Nothing to scan for. Pass at least one output file.")
+        return
+
+    channels = read_channels(channels_file)
+    asyncio.run(
+        scan_all_channels(
+            channels,
+            hours_back,
+            configs_output,
+            links_output,
+            verified_output,
+            refresh,
+        )
+    )
@@ -0,0 +1,156 @@
+import heapq
+import json
+import os
+import tempfile
+import zlib
+
+from services import renamer
+from services.fingerprint_pool import fingerprint_configs
+from services.fingerprint_store import FingerprintStore
+
+BUCKET_BYTES = 32 * 1024 * 1024  # input bytes per bucket, bounds memory per bucket
+MAX_BUCKETS = 512  # keep below the open file limit
+
+
+def bucket_count(file_path: str):
+    return min(MAX_BUCKETS, os.path.getsize(file_path) // BUCKET_BYTES + 1)
+
+
+def encode_fingerprint(fgp: str | bytes):
+    """One-line, tab-free form of a fingerprint for the bucket files."""
+    return fgp.hex() if isinstance(fgp, bytes) else json.dumps(fgp)
+
+
+def decode_fingerprint(token: str):
+    return json.loads(token) if token.startswith('"') else bytes.fromhex(token)
+
+
+def partition_configs(
+    configs_file: str,
+    bucket_paths: list[str],
+    workers: int = 1,
+    compact: bool = False,
+):
+    """
+    Streams the configs file into buckets by fingerprint hash, so every
+    copy of a server lands in the same bucket. Each bucket line keeps the
+    input line number to restore the original order later.
+    Returns the number of lines read.
+    """
+    buckets = [open(path, "w", encoding="utf-8") for path in bucket_paths]
+    processed = 0
+
+    try:
+        with open(configs_file, "r", encoding="utf-8") as f:
+            lines = (line.rstrip("\r\n") for line in f)
+            for line_num, (config, fgp) in enumerate(
+                fingerprint_configs(lines, workers, compact)
+            ):
+                processed += 1
+
+                if not fgp:
+                    continue  # Skip invalid configs
+
+                fgp = encode_fingerprint(fgp)
+                bucket = buckets[zlib.crc32(fgp.encode()) % len(buckets)]
+                bucket.write(f"{line_num}\t{fgp}\t{config}\n")
+    finally:
+        for bucket in buckets:
+            bucket.close()
+
+    return processed
+
+
+def dedupe_bucket(
+    bucket_path: str,
+    kept_path: str,
+    store: FingerprintStore | None = None,
+    since_last_run: bool = False,
+):
+    """
+    Keeps the first config of every fingerprint in one bucket and writes
+    them sorted by line number. Returns the unique and kept counts.
+    """
+    first_seen: dict[str, tuple[int, str]] = {}
+    sources: dict[str, set[str]] = {}
+
+    with open(bucket_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line_num, fgp, config = line.rstrip("\n").split("\t", 2)
+
+            if fgp not in first_seen:
+                first_seen[fgp] = (int(line_num), config)
+
+            if store:
+                channels = sources.setdefault(fgp, set())
+                channel = renamer.get_channel_name(config)
+                if channel:
+                    channels.add(channel)
+
+    os.remove(bucket_path)
+    unique_count = len(first_seen)
+
+    if store:
+        sources = {
+            decode_fingerprint(fgp): channels for fgp, channels in sources.items()
+        }
+        known = store.known_fingerprints(sources)
+        store.record_seen(sources)
+
+        if since_last_run:
+            first_seen = {
+                fgp: entry
+                for fgp, entry in first_seen.items()
+                if decode_fingerprint(fgp) not in known
+            }
+
+    with open(kept_path, "w", encoding="utf-8") as f:
+        for line_num, config in sorted(first_seen.values()):
+            f.write(f"{line_num}\t{config}\n")
+
+    return unique_count, len(first_seen)
+
+
+def read_kept(kept_path: str):
+    with open(kept_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line_num, config = line.rstrip("\n").split("\t", 1)
+            yield int(line_num), config
+
+
+def dedupe_file(
+    configs_file: str,
+    output_file: str,
+    store: FingerprintStore | None = None,
+    since_last_run: bool = False,
+    workers: int = 1,
+    compact: bool = False,
+):
+    """
+    Out-of-core dedupe for configs files larger than RAM: hash-partitions
+    the lines into on-disk buckets, dedupes one bucket at a time and merges
+    the survivors back in first-occurrence order.
+    Returns the processed, unique and kept counts.
+    """
+    # Next to the output, where there's room for a file of the same size
+    tmp_parent = os.path.dirname(os.path.abspath(output_file))
+
+    with tempfile.TemporaryDirectory(dir=tmp_parent) as tmp_dir:
+        buckets = bucket_count(configs_file)
+        bucket_paths = [os.path.join(tmp_dir, f"bucket-{i}") for i in range(buckets)]
+        kept_paths = [os.path.join(tmp_dir, f"kept-{i}") for i in range(buckets)]
+
+        processed = partition_configs(configs_file, bucket_paths, workers, compact)
+
+        unique_count = kept_count = 0
+        for bucket_path, kept_path in zip(bucket_paths, kept_paths):
+            unique, kept = dedupe_bucket(bucket_path, kept_path, store, since_last_run)
+            unique_count += unique
+            kept_count += kept
+
+        with open(output_file, "w", encoding="utf-8") as f:
+            kept_runs = [read_kept(path) for path in kept_paths]
+            for _, config in heapq.merge(*kept_runs):
+                f.write(config + "\n")
+
+    return processed, unique_count, kept_count
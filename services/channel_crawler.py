@@ -0,0 +1,365 @@
+import asyncio
+import datetime
+import math
+
+from models.telegram_message import MessageRecord
+from services.parse_executor import ParseExecutor
+from services.proxy_pool import ProxyPool
+from services.telegram_web_scraping import (
+    ChannelNotFoundError,
+    PageFetchError,
+    load_channel_messages,
+)
+
+# Reasons a channel crawl stopped
+RESTRICTED = "restricted"
+NOT_FOUND = "not_found"
+END_OF_HISTORY = "end_of_history"
+CUTOFF_REACHED = "cutoff_reached"
+HIGH_WATER_REACHED = "high_water_reached"
+CONSUMERS_DONE = "consumers_done"
+NO_PAGINATION = "no_pagination"
+MAX_PAGES_REACHED = "max_pages_reached"
+FETCH_FAILED = "fetch_failed"
+
+# Crawls that read every message down to where they were asked to stop
+COMPLETE = {CUTOFF_REACHED, HIGH_WATER_REACHED, END_OF_HISTORY}
+
+
+class MessageConsumer:
+    """
+    Receives every message of a channel that falls inside the crawl window.
+    Set `done` to True once the consumer needs no more messages; the crawl
+    stops early when every consumer is done.
+    """
+
+    done: bool = False
+
+    def consume(self, msg: MessageRecord):
+        raise NotImplementedError
+
+
+class CrawlResult:
+    status: str
+    pages: int
+    messages: int
+    last_msg_datetime: datetime.datetime | None
+    newest_msg_id: int | None
+    newest_msg_datetime: datetime.datetime | None
+
+    def __init__(self) -> None:
+        self.status = MAX_PAGES_REACHED
+        self.pages = 0
+        self.messages = 0
+        self.last_msg_datetime = None
+        self.newest_msg_id = None
+        self.newest_msg_datetime = None
+
+    def finish(self, status: str, last_msg_datetime: datetime.datetime | None):
+        self.status = status
+        self.last_msg_datetime = last_msg_datetime
+        return self
+
+    @property
+    def posting_rate(self):
+        """Messages per hour over the stretch of history this crawl covered."""
+        if not self.last_msg_datetime:
+            return None
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        hours = (now - self.last_msg_datetime).total_seconds() / 3600
+        if hours <= 0:
+            return None
+
+        return self.messages / hours
+
+
+def page_span(messages: list[MessageRecord]):
+    """How many message ids one page covered, used to guess further offsets."""
+    ids = [msg.id for msg in messages if msg.id]
+    if not ids:
+        return None
+    return max(ids) - min(ids) + 1
+
+
+def chain_pages(
+    cursor: int, offsets: list[int], pages: list[list[MessageRecord] | None]
+):
+    """
+    Stitches concurrently fetched pages into one newest-first run of messages
+    below `cursor`. A page is used only while it connects to what is already
+    covered (its offset is at or above the covered bottom); overlapping
+    messages are dropped, and anything past a gap is left for the next round,
+    which refetches from the new bottom.
+    """
+    messages: list[MessageRecord] = []
+    bottom = cursor
+    pages_used = 0
+
+    candidates = []
+    for offset, page in zip(offsets, pages):
+        ids = [msg.id for msg in page or [] if msg.id]
+        if ids:
+            candidates.append((offset, min(ids), page))
+
+    while True:
+        best = None
+        for offset, page_bottom, page in candidates:
+            if offset >= bottom and page_bottom < bottom:
+                if best is None or page_bottom < best[1]:
+                    best = (offset, page_bottom, page)
+
+        if best is None:
+            return messages, pages_used
+
+        _, page_bottom, page = best
+        messages.extend(msg for msg in page if msg.id and msg.id < bottom)
+        bottom = page_bottom
+        pages_used += 1
+
+
+def plan_prefetch_offsets(
+    cursor: int,
+    span: int,
+    prefetch: int,
+    pages_left: int,
+    cursor_datetime: datetime.datetime,
+    page_duration: datetime.timedelta | None,
+    cutoff_date: datetime.datetime,
+    stop_at_id: int | None,
+):
+    """
+    Guesses the next `before=` offsets from message-id arithmetic, without
+    planning pages that would land past the cutoff date or the high-water mark.
+    """
+    count = min(prefetch, pages_left)
+
+    if page_duration and page_duration.total_seconds() > 0:
+        pages_to_cutoff = math.ceil((cursor_datetime - cutoff_date) / page_duration)
+        count = min(count, max(1, pages_to_cutoff))
+
+    if stop_at_id is not None:
+        count = min(count, max(1, math.ceil((cursor - stop_at_id) / span)))
+
+    return [cursor - i * span for i in range(count) if cursor - i * span > 0]
+
+
+async def seek_window_end(
+    channel: str,
+    proxies: ProxyPool,
+    parser: ParseExecutor | None,
+    end_date: datetime.datetime,
+    first_page: list[MessageRecord],
+):
+    """
+    Bisects `before=` ids for the page that holds the newest message posted
+    at or before `end_date`, so a historical window is reached in O(log n)
+    fetches instead of paging through every newer message first.
+
+    Returns the offset to continue from, the page already loaded at that
+    offset (None if it still has to be fetched) and the number of fetches.
+    """
+    dated = [msg for msg in first_page if msg.id and msg.datetime]
+    if not dated or dated[-1].datetime <= end_date:
+        return None, first_page, 0
+
+    span = page_span(dated) or 1
+    # Message `hi` is newer than end_date; nothing below `lo` is
+    lo, hi = 0, dated[-1].id
+    fetched = 0
+
+    while hi - lo > span:
+        mid = (lo + hi) // 2
+        fetched += 1
+        try:
+            page = await load_channel_messages(channel, proxies, mid, parser)
+        except PageFetchError:
+            # A failed probe says nothing about mid; page down from `hi` instead
+            break
+
+        dated = [msg for msg in page or [] if msg.id and msg.datetime]
+        if not dated or dated[0].datetime <= end_date:
+            lo = mid
+        elif dated[-1].datetime <= end_date:
+            return mid, page, fetched
+        else:
+            hi = dated[-1].id
+
+    return hi, None, fetched
+
+
+async def crawl_channel(
+    channel: str,
+    cutoff_date: datetime.datetime,
+    proxies: ProxyPool,
+    semaphore: asyncio.Semaphore,
+    consumers: list[MessageConsumer],
+    max_pages: int,
+    stop_at_id: int | None = None,
+    parser: ParseExecutor | None = None,
+    prefetch: int = 1,
+    end_date: datetime.datetime | None = None,
+):
+    """
+    Pages through t.me/s/<channel> from the newest message back to
+    `cutoff_date`, fetching every page once and feeding each message to all
+    consumers. When `stop_at_id` is given, pagination also stops at that
+    message id (the high-water mark of a previous run). Request pacing is
+    left to the rate limiters of the proxy pool.
+
+    With `end_date`, only messages posted up to then are consumed and the
+    crawl jumps straight to it (see `seek_window_end`).
+
+    With `prefetch` > 1, up to that many older pages are fetched concurrently
+    from estimated offsets and stitched back together (see `chain_pages`).
+
+    A page that can't be loaded ends the crawl with FETCH_FAILED, which says
+    nothing about the channel itself.
+    """
+    async with semaphore:
+        result = CrawlResult()
+        last_msg_datetime = datetime.datetime.now(datetime.timezone.utc)
+        next_offset_id = None
+        span = None
+        page_duration = None
+        preloaded = None
+
+        if end_date:
+            try:
+                first_page = await load_channel_messages(channel, proxies, None, parser)
+            except ChannelNotFoundError:
+                return result.finish(NOT_FOUND, last_msg_datetime)
+            except PageFetchError:
+                return result.finish(FETCH_FAILED, last_msg_datetime)
+
+            if not first_page:
+                return result.finish(RESTRICTED, last_msg_datetime)
+
+            next_offset_id, preloaded, fetched = await seek_window_end(
+                channel, proxies, parser, end_date, first_page
+            )
+            # Seeking doesn't eat into the page budget of the window itself;
+            # the preloaded page is counted when the loop below consumes it
+            seek_pages = 1 + fetched - (preloaded is not None)
+            result.pages += seek_pages
+            max_pages += seek_pages
+
+        while result.pages < max_pages:
+            if last_msg_datetime < cutoff_date:
+                return result.finish(CUTOFF_REACHED, last_msg_datetime)
+
+            if next_offset_id and span and prefetch > 1:
+                offsets = plan_prefetch_offsets(
+                    next_offset_id,
+                    span,
+                    prefetch,
+                    max_pages - result.pages,
+                    last_msg_datetime,
+                    page_duration,
+                    cutoff_date,
+                    stop_at_id,
+                )
+                loaded = await asyncio.gather(
+                    *(
+                        load_channel_messages(channel, proxies, offset, parser)
+                        for offset in offsets
+                    ),
+                    return_exceptions=True,
+                )
+                for page in loaded:
+                    if isinstance(page, BaseException) and not isinstance(
+                        page, PageFetchError
+                    ):
+                        raise page
+
+                # Failed pages leave a gap, refetched next round
+                fetch_failed = any(isinstance(page, PageFetchError) for page in loaded)
+                pages = [
+                    None if isinstance(page, PageFetchError) else page
+                    for page in loaded
+                ]
+                messages, pages_used = chain_pages(next_offset_id, offsets, pages)
+
+                # Denser guesses next round: overlaps cost less than gaps
+                for page in pages:
+                    page_ids_span = page_span(page) if page else None
+                    if page_ids_span:
+                        span = min(span, page_ids_span)
+
+                result.pages += len(offsets)
+            else:
+                if preloaded is not None:
+                    messages, preloaded = preloaded, None
+                else:
+                    try:
+                        messages = await load_channel_messages(
+                            channel, proxies, next_offset_id, parser
+                        )
+                    except ChannelNotFoundError:
+                        return result.finish(NOT_FOUND, last_msg_datetime)
+                    except PageFetchError:
+                        return result.finish(FETCH_FAILED, last_msg_datetime)
+                pages_used = 1
+                fetch_failed = False
+
+                if messages:
+                    span = page_span(messages)
+                    result.pages += 1
+
+            if not messages:
+                if fetch_failed:
+                    return result.finish(FETCH_FAILED, last_msg_datetime)
+                status = RESTRICTED if next_offset_id is None else END_OF_HISTORY
+                return result.finish(status, last_msg_datetime)
+
+            for msg in messages:
+                msg_datetime = msg.datetime
+
+                if not msg_datetime:
+                    continue
+
+                if end_date and msg_datetime > end_date:
+                    continue
+
+                msg_id = msg.id
+
+                if msg_id and result.newest_msg_id is None:
+                    result.newest_msg_id = msg_id
+                    result.newest_msg_datetime = msg_datetime
+
+                if stop_at_id is not None and msg_id and msg_id <= stop_at_id:
+                    return result.finish(HIGH_WATER_REACHED, msg_datetime)
+
+                if msg_datetime < cutoff_date:
+                    return result.finish(CUTOFF_REACHED, msg_datetime)
+
+                result.messages += 1
+                for consumer in consumers:
+                    if not consumer.done:
+                        consumer.consume(msg)
+
+                if all(consumer.done for consumer in consumers):
+                    return result.finish(CONSUMERS_DONE, msg_datetime)
+
+            newest_datetime = next(
+                (msg.datetime for msg in messages if msg.datetime), None
+            )
+            last_msg_datetime = None
+            next_offset_id = None
+
+            for msg in reversed(messages):
+                p_id = msg.id
+                p_date = msg.datetime
+
+                if p_id and p_date:
+                    next_offset_id = p_id
+                    last_msg_datetime = p_date
+                    break
+
+            if not last_msg_datetime or not next_offset_id:
+                return result.finish(NO_PAGINATION, last_msg_datetime)
+
+            if newest_datetime:
+                page_duration = (newest_datetime - last_msg_datetime) / pages_used
+
+        return result.finish(MAX_PAGES_REACHED, last_msg_datetime)
@@ -0,0 +1,62 @@
+import math
+
+from services.crawl_state import CrawlState
+
+MESSAGES_PER_PAGE = 20
+BUDGET_MARGIN = 1.5  # Room for bursts above the usual posting rate
+BARREN_RUNS = 5  # Runs without configs before a channel counts as barren
+BARREN_PROBE_EVERY = 4  # Barren channels are crawled on every Nth run only
+
+
+class ChannelPlan:
+    channel: str
+    max_pages: int
+    priority: float
+
+    def __init__(self, channel: str, max_pages: int, priority: float) -> None:
+        self.channel = channel
+        self.max_pages = max_pages
+        self.priority = priority
+
+
+def page_budget(posting_rate: float | None, hours_back: int, max_pages: int):
+    """Pages needed to cover `hours_back` hours at the channel's posting rate."""
+    if posting_rate is None:
+        return max_pages
+
+    expected_messages = posting_rate * hours_back * BUDGET_MARGIN
+    pages = math.ceil(expected_messages / MESSAGES_PER_PAGE) + 1
+    return max(1, min(max_pages, pages))
+
+
+def plan_channels(
+    channels: list[str], state: CrawlState, hours_back: int, max_pages: int
+):
+    """
+    Orders channels by their past yield (new channels first, since they have
+    no stats yet), sizes each channel's page budget from its posting rate and
+    leaves out barren channels that are not due for a probe this run.
+    """
+    plans: list[ChannelPlan] = []
+    skipped: list[str] = []
+
+    for channel in channels:
+        stats = state.get_channel_stats(channel)
+
+        if stats is None:
+            plans.append(ChannelPlan(channel, max_pages, math.inf))
+            continue
+
+        if (
+            stats.barren_runs >= BARREN_RUNS
+            and stats.skipped_runs < BARREN_PROBE_EVERY - 1
+        ):
+            state.record_channel_skip(channel)
+            skipped.append(channel)
+            continue
+
+        budget = page_budget(stats.posting_rate, hours_back, max_pages)
+        plans.append(ChannelPlan(channel, budget, stats.configs_per_run))
+
+    plans.sort(key=lambda plan: plan.priority, reverse=True)
+    return plans, skipped
@@ -0,0 +1,160 @@
+import datetime
+import sqlite3
+
+from services import channel_crawler
+from services.parse_iso_date import parse_iso_date
+
+# Verdicts a crawl can reach about a channel
+RESTRICTED = "restricted"
+NOT_FOUND = "not_found"
+NO_CONFIGS = "no_configs"
+HAS_CONFIGS = "has_configs"
+
+VERDICT_TTLS = {
+    RESTRICTED: datetime.timedelta(days=7),
+    NOT_FOUND: datetime.timedelta(days=30),
+    NO_CONFIGS: datetime.timedelta(days=1),
+    HAS_CONFIGS: datetime.timedelta(days=3),
+}
+
+# Channels with these verdicts have nothing to scrape for any command
+UNREACHABLE = {RESTRICTED, NOT_FOUND}
+
+
+def unreachable_verdict(crawl_status: str):
+    """Maps a crawl that could not read the channel at all to its verdict."""
+    if crawl_status == channel_crawler.RESTRICTED:
+        return RESTRICTED
+    if crawl_status == channel_crawler.NOT_FOUND:
+        return NOT_FOUND
+    return None
+
+
+def checked_since(result: channel_crawler.CrawlResult, cutoff_date: datetime.datetime):
+    """
+    How far back a crawl that found no configs actually read: the cutoff
+    if it got there, else the oldest message it reached.
+    """
+    if not result.last_msg_datetime:
+        return None
+    return max(cutoff_date, result.last_msg_datetime)
+
+
+def is_conclusive(crawl_status: str):
+    """False for crawls cut short by a failed fetch, whose verdict can't be trusted."""
+    return crawl_status != channel_crawler.FETCH_FAILED
+
+
+class ChannelStatusCache:
+    """
+    Persistent channel verdicts with a per-verdict TTL, so crawlers don't
+    spend requests re-probing channels whose answer is already known.
+    NO_CONFIGS only holds for the stretch of history that was read, so it
+    is stored with how far back that went and only reused for windows it
+    covers. Backed by a local SQLite file.
+    """
+
+    def __init__(self, file_path: str, refresh: bool = False) -> None:
+        self.file_path = file_path
+        self.refresh = refresh
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_status (
+                channel TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                checked_at TEXT NOT NULL
+            )
+            """)
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(channel_status)")
+        ]
+        if "checked_since" not in columns:
+            # Caches from before windows were stored
+            self.conn.execute(
+                "ALTER TABLE channel_status ADD COLUMN checked_since TEXT"
+            )
+        self.conn.commit()
+
+    def get_verdict(self, channel: str, cutoff_date: datetime.datetime | None = None):
+        """
+        Returns the channel's verdict while it is fresh, else None. A
+        NO_CONFIGS verdict is only returned if its crawl read back to
+        `cutoff_date`.
+        """
+        if self.refresh:
+            return None
+
+        row = self.conn.execute(
+            "SELECT verdict, checked_at, checked_since FROM channel_status WHERE channel = ?",
+            (channel.lower(),),
+        ).fetchone()
+
+        if not row:
+            return None
+
+        verdict, checked_at, checked_since = row
+        if verdict == NO_CONFIGS:
+            checked_since = parse_iso_date(checked_since) if checked_since else None
+            if not cutoff_date or not checked_since or checked_since > cutoff_date:
+                return None
+
+        ttl = VERDICT_TTLS.get(verdict)
+        checked_at = parse_iso_date(checked_at)
+        if not ttl or not checked_at:
+            return None
+
+        if datetime.datetime.now(datetime.timezone.utc) - checked_at > ttl:
+            return None
+
+        return verdict
+
+    def set_verdict(
+        self,
+        channel: str,
+        verdict: str,
+        checked_since: datetime.datetime | None = None,
+    ):
+        """`checked_since` is how far back the crawl read, for NO_CONFIGS."""
+        self.conn.execute(
+            """
+            INSERT INTO channel_status (channel, verdict, checked_at, checked_since)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(channel) DO UPDATE SET
+                verdict = excluded.verdict,
+                checked_at = excluded.checked_at,
+                checked_since = excluded.checked_since
+            """,
+            (
+                channel.lower(),
+                verdict,
+                datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                checked_since.isoformat() if checked_since else None,
+            ),
+        )
+        self.conn.commit()
+
+    def split_channels(
+        self,
+        channels: list[str],
+        skip_verdicts: set[str],
+        cutoff_date: datetime.datetime | None = None,
+    ):
+        """
+        Splits channels into the ones to crawl and a {channel: verdict} map
+        of the ones whose fresh verdict is in `skip_verdicts`, for a crawl
+        back to `cutoff_date`.
+        """
+        to_crawl: list[str] = []
+        cached: dict[str, str] = {}
+
+        for channel in channels:
+            verdict = self.get_verdict(channel, cutoff_date)
+            if verdict in skip_verdicts:
+                cached[channel] = verdict
+            else:
+                to_crawl.append(channel)
+
+        return to_crawl, cached
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,48 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable
+
+CHUNK_SIZE = 5000  # items per task, big enough to amortize pickling
+CHUNKS_IN_FLIGHT = 2  # per worker, bounds memory on streamed input
+
+
+def iter_chunks(items: Iterable, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def map_chunks_ordered(
+    fn: Callable[..., list], items: Iterable, workers: int = 1, *args: Any
+):
+    """
+    Yields (item, result) pairs in input order, where `fn(chunk, *args)`
+    returns the results of a chunk of items. With more than one worker,
+    chunks run in a process pool (so `fn` must be picklable) while only a
+    few chunks are in flight at a time, so `items` may be a stream larger
+    than memory.
+    """
+    if workers <= 1:
+        for chunk in iter_chunks(items, CHUNK_SIZE):
+            yield from zip(chunk, fn(chunk, *args))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+
+        for chunk in iter_chunks(items, CHUNK_SIZE):
+            in_flight.append((chunk, pool.submit(fn, chunk, *args)))
+
+            if len(in_flight) >= workers * CHUNKS_IN_FLIGHT:
+                chunk, future = in_flight.popleft()
+                yield from zip(chunk, future.result())
+
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield from zip(chunk, future.result())
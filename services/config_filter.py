@@ -0,0 +1,244 @@
+import base64
+import json
+import re
+from collections import Counter
+from typing import Iterable
+
+from models.v2ray_config import V2rayConfig
+from services import parse_config_link
+from services.chunk_pool import map_chunks_ordered
+from services.parse_cache import ParseCache, ParseResult
+
+# Rejection reasons
+BAD_BASE64 = "bad base64"
+UNSUPPORTED_PROTOCOL = "unsupported protocol"
+MALFORMED_LINK = "malformed link"
+MISSING_SERVER = "missing server"
+INVALID_PORT = "missing or invalid port"
+INVALID_SS_METHOD = "invalid shadowsocks method"
+MISSING_SS_PASSWORD = "missing shadowsocks password"
+INVALID_SS_2022_KEY = "invalid shadowsocks 2022 key"
+UNSUPPORTED_FLOW = "unsupported vless flow"
+UNSUPPORTED_TRANSPORT = "unsupported transport"
+INVALID_PATH = "invalid transport path"
+INVALID_REALITY_KEY = "invalid reality key"
+INVALID_REALITY_SHORT_ID = "invalid reality short id"
+
+PARSE_ERRORS = {
+    "Invalid VMess base64": BAD_BASE64,
+    "Invalid Legacy SS Base64 (No '@' found)": BAD_BASE64,
+    "Unsupported protocol": UNSUPPORTED_PROTOCOL,
+}
+
+SS_2022_METHODS = {
+    "2022-blake3-aes-128-gcm",
+    "2022-blake3-aes-256-gcm",
+    "2022-blake3-chacha20-poly1305",
+}
+
+VALID_FINGERPRINTS = {
+    "chrome",
+    "firefox",
+    "edge",
+    "safari",
+    "360",
+    "qq",
+    "ios",
+    "android",
+    "randomized",
+}
+
+# sing-box refuses to start a reality client without uTLS
+REALITY_DEFAULT_FINGERPRINT = "chrome"
+
+
+def is_valid_base64_key(key_str, required_len=None):
+    """
+    Checks if a string is a valid Base64 key.
+    required_len: Expected byte length (e.g., 32 for Reality, 16 or 32 for SS-2022)
+    """
+    if not key_str:
+        return False
+
+    if not re.match(r"^[A-Za-z0-9+\/\-_=]+$", key_str):
+        return False
+
+    try:
+        s = key_str.replace("-", "+").replace("_", "/")
+        padding = len(s) % 4
+        if padding:
+            s += "=" * (4 - padding)
+
+        decoded = base64.b64decode(s, validate=True)
+
+        if required_len and len(decoded) != required_len:
+            return False
+
+        return True
+    except Exception:
+        return False
+
+
+def parse_error_reason(error: Exception):
+    message = str(error)
+    if message in PARSE_ERRORS:
+        return PARSE_ERRORS[message]
+    if "port" in message.lower():
+        return INVALID_PORT
+    return MALFORMED_LINK
+
+
+def check_outbound(p: dict):
+    """
+    Checks that sing-box can run an outbound, fixing up what it can in
+    place (dropping plain transports, unknown uTLS fingerprints, giving
+    reality links without a usable one the default).
+    Returns why it's rejected, or None if it's supported.
+    """
+    if not p.get("server"):
+        return MISSING_SERVER
+
+    try:
+        port = int(p.get("server_port", 0))
+        if not (1 <= port <= 65535):
+            return INVALID_PORT
+    except (TypeError, ValueError):
+        return INVALID_PORT
+
+    if p["type"] == "shadowsocks":
+        method = p.get("method", "").lower()
+        password = p.get("password", "")
+
+        if method not in parse_config_link.VALID_SS_METHODS:
+            return INVALID_SS_METHOD
+        if not password:
+            return MISSING_SS_PASSWORD
+
+        if method in SS_2022_METHODS:
+            req_len = 16 if "128" in method else 32
+            if not is_valid_base64_key(password, req_len):
+                return INVALID_SS_2022_KEY
+
+    if p["type"] == "vless":
+        flow = p.get("flow", "").lower()
+        if flow and flow != "xtls-rprx-vision":
+            return UNSUPPORTED_FLOW
+
+    if "transport" in p:
+        t_type = p["transport"].get("type", "")
+        if t_type == "xhttp":
+            return UNSUPPORTED_TRANSPORT
+        if t_type in ["tcp", "raw", "none", ""]:
+            del p["transport"]
+
+        elif t_type in ["ws", "httpupgrade"]:
+            path = p["transport"].get("path", "")
+
+            if re.search(r"%(?![0-9a-fA-F]{2})", path):
+                return INVALID_PATH
+
+    if "tls" in p and p["tls"]:
+
+        if "utls" in p["tls"] and not p["tls"]["utls"]:
+            del p["tls"]["utls"]  # Links without fp= leave it empty
+
+        if "utls" in p["tls"]:
+            fp = p["tls"]["utls"].get("fingerprint", "").lower()
+
+            if fp == "random":
+                p["tls"]["utls"]["fingerprint"] = "randomized"
+                fp = "randomized"
+
+            if fp and fp not in VALID_FINGERPRINTS:
+                del p["tls"]["utls"]
+
+        if "reality" in p["tls"]:
+            p["tls"].setdefault(
+                "utls", {"enabled": True, "fingerprint": REALITY_DEFAULT_FINGERPRINT}
+            )
+
+            reality = p["tls"]["reality"]
+            pbk = reality.get("public_key", "")
+            sid = reality.get("short_id", "")
+
+            if not is_valid_base64_key(pbk, 32):
+                return INVALID_REALITY_KEY
+
+            if sid and not re.match(r"^[0-9a-fA-F]+$", sid):
+                return INVALID_REALITY_SHORT_ID
+
+    return None
+
+
+def rejection_reason(config: V2rayConfig):
+    """Builds the outbound of a config, returns why it's rejected or None."""
+    try:
+        return check_outbound(config.outbound)
+    except Exception as e:
+        return parse_error_reason(e)
+
+
+def parse_chunk(links: list[str]):
+    """Runs in a worker process; returns the (outbound, reason) of every link."""
+    results = []
+    for link in links:
+        config = V2rayConfig(link)
+        reason = rejection_reason(config)
+        results.append((None if reason else config.outbound, reason))
+
+    return results
+
+
+def parse_results(links: Iterable[str], workers: int = 1):
+    """Yields (link, (outbound, reason)) pairs in input order."""
+    return map_chunks_ordered(parse_chunk, links, workers)
+
+
+def cached_results(links: list[str], workers: int, cache: ParseCache):
+    """Like `parse_results`, only parsing the links missing from `cache`."""
+    results = cache.lookup(links)
+
+    parsed = dict(
+        parse_results((link for link in links if link not in results), workers)
+    )
+    stored: dict[str, ParseResult] = {
+        link: (json.dumps(outbound) if outbound else None, reason)
+        for link, (outbound, reason) in parsed.items()
+    }
+    cache.store(stored)
+    results.update(stored)
+
+    for link in links:
+        if link in parsed:
+            yield link, parsed.pop(link)
+            continue
+
+        # Decoded per link, so repeated links don't share one outbound
+        outbound, reason = results[link]
+        yield link, (json.loads(outbound) if outbound else None, reason)
+
+
+def parse_links(
+    links: Iterable[str], workers: int = 1, cache: ParseCache | None = None
+):
+    """
+    Parses and validates links in chunks, in a process pool with more than
+    one worker. With a `cache`, only links it doesn't know are parsed.
+    Returns the accepted configs in input order and a Counter of why the
+    others were rejected.
+    """
+    configs: list[V2rayConfig] = []
+    rejections: Counter[str] = Counter()
+
+    if cache:
+        results = cached_results(list(links), workers, cache)
+    else:
+        results = parse_results(links, workers)
+
+    for link, (outbound, reason) in results:
+        if reason:
+            rejections[reason] += 1
+        else:
+            configs.append(V2rayConfig(link, outbound))
+
+    return configs, rejections
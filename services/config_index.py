@@ -0,0 +1,58 @@
+import csv
+
+from models.v2ray_config import V2rayConfig
+
+
+class FingerprintIndex:
+    """
+    Fingerprints of every config collected in a run (see `fingerprint`),
+    shared by all channels. The first channel to post a server owns the
+    written link; channels that repost it are only recorded as sources.
+    Links are kept as posted and renamed after their owner on export.
+    With `compact`, servers are keyed by 16-byte fingerprint digests.
+    """
+
+    links: dict[str | bytes, str]
+    sources: dict[str | bytes, list[str]]
+    compact: bool
+
+    def __init__(self, compact: bool = False) -> None:
+        self.links = {}
+        self.sources = {}
+        self.compact = compact
+
+    def fingerprint(self, config: V2rayConfig):
+        return config.digest if self.compact else config.fingerprint
+
+    def __contains__(self, fgp: str | bytes):
+        return fgp in self.links
+
+    def __len__(self):
+        return len(self.links)
+
+    def add(self, fgp: str | bytes, link: str, channel: str):
+        self.links[fgp] = link
+        self.sources[fgp] = [channel]
+
+    def add_source(self, fgp: str | bytes, channel: str):
+        """Records another channel posting a known server, True if it is new."""
+        channels = self.sources[fgp]
+        if channel in channels:
+            return False
+
+        channels.append(channel)
+        return True
+
+    @property
+    def duplicates(self):
+        return sum(len(channels) - 1 for channels in self.sources.values())
+
+    def write_provenance(self, file_path: str):
+        """Saves every written config with the channels that posted it."""
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["config", "channels"])
+            for fgp, link in self.links.items():
+                channels = self.sources[fgp]
+                config = V2rayConfig(link, channel=channels[0])
+                writer.writerow([config.export_link, " ".join(channels)])
@@ -0,0 +1,139 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from models.v2ray_config import V2rayConfig
+from services.port_allocator import PortAllocator
+
+
+class CoreShard:
+    """One slot for a core process: its own config file and inbound ports."""
+
+    shard_id: int
+    base_port: int
+    config_file: str
+
+    def __init__(self, shard_id: int, base_port: int, config_file: str) -> None:
+        self.shard_id = shard_id
+        self.base_port = base_port
+        self.config_file = config_file
+
+
+class ShardPool:
+    """
+    Runs batches on `shards` cores side by side. Every shard gets `buffers`
+    slots, each with a range of `ports_per_shard` free ports from the
+    allocator and a config file in a temp directory. With two slots a shard
+    boots its next batch's core on one while the current batch is probed on
+    the other, so core startup overlaps probing.
+    """
+
+    shards: list[list[CoreShard]]
+
+    def __init__(
+        self,
+        shards: int,
+        ports_per_shard: int,
+        allocator: PortAllocator,
+        buffers: int = 1,
+    ) -> None:
+        self.shard_count = shards
+        self.ports_per_shard = ports_per_shard
+        self.allocator = allocator
+        self.buffers = buffers
+        self.shards = []
+
+    def __enter__(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix="rayzor-cores-")
+        for shard_id in range(self.shard_count):
+            self.shards.append(
+                [
+                    CoreShard(
+                        shard_id,
+                        self.allocator.allocate(self.ports_per_shard),
+                        os.path.join(self.tmp_dir, f"core-{shard_id}-{slot}.json"),
+                    )
+                    for slot in range(self.buffers)
+                ]
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        for slots in self.shards:
+            for shard in slots:
+                self.allocator.release(shard.base_port)
+        self.shards = []
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def run(
+        self,
+        start_batch: Callable[[list[V2rayConfig], CoreShard], Any],
+        finish_batch: Callable[[Any, list[V2rayConfig], int, CoreShard], list[dict]],
+        stop_batch: Callable[[Any, CoreShard], None],
+        batches: list[list[V2rayConfig]],
+    ):
+        """
+        Every shard takes batches, with ids counting from 1, in turn:
+        `start_batch(batch, slot)` launches a batch's core on a free slot
+        and returns a handle, `finish_batch(handle, batch, batch_id, slot)`
+        probes it and stops the core. A shard starts batches on all its free
+        slots before finishing the oldest one; `stop_batch(handle, slot)`
+        stops the ones left started if it fails. Yields (batch_id, results)
+        as batches finish.
+
+        If a shard fails or the caller stops iterating (Ctrl-C included),
+        shards finish the batch they are probing, stop the cores booted
+        ahead and take no more batches.
+        """
+        todo: queue.Queue[tuple[int, list[V2rayConfig]]] = queue.Queue()
+        for batch_id, batch in enumerate(batches, start=1):
+            todo.put((batch_id, batch))
+        done: queue.Queue[tuple[int, list[dict]] | None] = queue.Queue()
+        stopping = threading.Event()
+
+        def run_shard(slots: list[CoreShard]):
+            free_slots = deque(slots)
+            started = deque()
+            try:
+                while True:
+                    while free_slots and not stopping.is_set():
+                        try:
+                            batch_id, batch = todo.get_nowait()
+                        except queue.Empty:
+                            break
+                        slot = free_slots.popleft()
+                        started.append(
+                            (start_batch(batch, slot), batch, batch_id, slot)
+                        )
+
+                    if not started or stopping.is_set():
+                        return
+
+                    handle, batch, batch_id, slot = started.popleft()
+                    done.put((batch_id, finish_batch(handle, batch, batch_id, slot)))
+                    free_slots.append(slot)
+            except BaseException:
+                stopping.set()
+                raise
+            finally:
+                for handle, _, _, slot in started:
+                    stop_batch(handle, slot)
+                done.put(None)
+
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+            futures = [executor.submit(run_shard, slots) for slots in self.shards]
+            try:
+                for _ in futures:
+                    while (finished := done.get()) is not None:
+                        yield finished
+            finally:
+                # Leaving the executor waits for the shards, so stop them first
+                stopping.set()
+
+            for future in futures:
+                future.result()
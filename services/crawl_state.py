@@ -0,0 +1,193 @@
+import datetime
+import sqlite3
+
+from services.parse_iso_date import parse_iso_date
+
+POSTING_RATE_SMOOTHING = 0.5
+
+
+class ChannelStats:
+    """What previous runs learned about a channel, used for scheduling."""
+
+    runs: int
+    pages: int
+    configs: int
+    posting_rate: float | None  # messages per hour
+    last_nonempty: datetime.datetime | None
+    barren_runs: int  # consecutive runs with messages but without configs
+    skipped_runs: int  # consecutive runs the channel was not probed
+
+    def __init__(
+        self,
+        runs: int,
+        pages: int,
+        configs: int,
+        posting_rate: float | None,
+        last_nonempty: datetime.datetime | None,
+        barren_runs: int,
+        skipped_runs: int,
+    ) -> None:
+        self.runs = runs
+        self.pages = pages
+        self.configs = configs
+        self.posting_rate = posting_rate
+        self.last_nonempty = last_nonempty
+        self.barren_runs = barren_runs
+        self.skipped_runs = skipped_runs
+
+    @property
+    def configs_per_run(self):
+        return self.configs / self.runs if self.runs else 0.0
+
+
+class CrawlState:
+    """
+    Persistent per-channel crawl state, backed by a local SQLite file:
+    high-water marks (the newest message id and datetime seen by a previous
+    crawl) and yield statistics used to schedule the next runs.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_state (
+                channel TEXT PRIMARY KEY,
+                last_msg_id INTEGER NOT NULL,
+                last_msg_datetime TEXT NOT NULL
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_stats (
+                channel TEXT PRIMARY KEY,
+                runs INTEGER NOT NULL DEFAULT 0,
+                pages INTEGER NOT NULL DEFAULT 0,
+                configs INTEGER NOT NULL DEFAULT 0,
+                posting_rate REAL,
+                last_nonempty TEXT,
+                barren_runs INTEGER NOT NULL DEFAULT 0,
+                skipped_runs INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+        self.conn.commit()
+
+    def get_high_water_mark(self, channel: str):
+        row = self.conn.execute(
+            "SELECT last_msg_id, last_msg_datetime FROM channel_state WHERE channel = ?",
+            (channel.lower(),),
+        ).fetchone()
+
+        if not row:
+            return None, None
+
+        return row[0], parse_iso_date(row[1])
+
+    def set_high_water_mark(
+        self, channel: str, msg_id: int, msg_datetime: datetime.datetime
+    ):
+        # Never move a mark backwards (e.g. after a partial crawl)
+        self.conn.execute(
+            """
+            INSERT INTO channel_state (channel, last_msg_id, last_msg_datetime)
+            VALUES (?, ?, ?)
+            ON CONFLICT(channel) DO UPDATE SET
+                last_msg_id = excluded.last_msg_id,
+                last_msg_datetime = excluded.last_msg_datetime
+            WHERE excluded.last_msg_id > channel_state.last_msg_id
+            """,
+            (channel.lower(), msg_id, msg_datetime.isoformat()),
+        )
+        self.conn.commit()
+
+    def get_channel_stats(self, channel: str):
+        row = self.conn.execute(
+            """
+            SELECT runs, pages, configs, posting_rate, last_nonempty,
+                barren_runs, skipped_runs
+            FROM channel_stats WHERE channel = ?
+            """,
+            (channel.lower(),),
+        ).fetchone()
+
+        if not row:
+            return None
+
+        runs, pages, configs, posting_rate, last_nonempty, barren, skipped = row
+        return ChannelStats(
+            runs,
+            pages,
+            configs,
+            posting_rate,
+            parse_iso_date(last_nonempty) if last_nonempty else None,
+            barren,
+            skipped,
+        )
+
+    def record_channel_run(
+        self,
+        channel: str,
+        pages: int,
+        messages: int,
+        configs: int,
+        posting_rate: float | None,
+    ):
+        """
+        Adds one crawl of the channel to its statistics. A run without new
+        messages says nothing about the channel's yield, so it leaves the
+        barren streak as it is.
+        """
+        stats = self.get_channel_stats(channel)
+
+        if stats and stats.posting_rate is not None and posting_rate is not None:
+            posting_rate = stats.posting_rate + POSTING_RATE_SMOOTHING * (
+                posting_rate - stats.posting_rate
+            )
+        elif posting_rate is None and stats:
+            posting_rate = stats.posting_rate
+
+        last_nonempty = stats.last_nonempty if stats else None
+        if configs > 0:
+            last_nonempty = datetime.datetime.now(datetime.timezone.utc)
+
+        barren_runs = stats.barren_runs if stats else 0
+        if configs > 0:
+            barren_runs = 0
+        elif messages > 0:
+            barren_runs += 1
+
+        self.conn.execute(
+            """
+            INSERT INTO channel_stats (
+                channel, runs, pages, configs, posting_rate, last_nonempty,
+                barren_runs, skipped_runs
+            )
+            VALUES (?, 1, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(channel) DO UPDATE SET
+                runs = runs + 1,
+                pages = pages + excluded.pages,
+                configs = configs + excluded.configs,
+                posting_rate = excluded.posting_rate,
+                last_nonempty = excluded.last_nonempty,
+                barren_runs = excluded.barren_runs,
+                skipped_runs = 0
+            """,
+            (
+                channel.lower(),
+                pages,
+                configs,
+                posting_rate,
+                last_nonempty.isoformat() if last_nonempty else None,
+                barren_runs,
+            ),
+        )
+        self.conn.commit()
+
+    def record_channel_skip(self, channel: str):
+        self.conn.execute(
+            "UPDATE channel_stats SET skipped_runs = skipped_runs + 1 WHERE channel = ?",
+            (channel.lower(),),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
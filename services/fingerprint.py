@@ -1,7 +1,10 @@
 import base64
+import hashlib
 import json
 import urllib.parse
 
+DIGEST_SIZE = 16  # bytes
+
 
 def safe_base64_decode(s):
     """Safely decodes base64 strings with missing padding."""
@@ -29,24 +32,28 @@ def get_vmess_fingerprint(link):
 
         data = json.loads(decoded)
 
-        # 2. Extract functional fields only
-        # We assume if IP, Port, ID, and Network match, it's the same server.
-        # 'add' = address, 'id' = uuid
-        fingerprint = (
-            f"vmess|"
-            f"{data.get('add', '').lower()}|"
-            f"{data.get('port', '')}|"
-            f"{data.get('id', '')}|"
-            f"{data.get('net', '')}|"
-            f"{data.get('path', '')}|"
-            f"{data.get('host', '')}|"
-            f"{data.get('sni', '')}"
-        )
-        return fingerprint
+        return vmess_fingerprint(data)
     except Exception:
         return None  # If we can't parse it, treat it as invalid or unique
 
 
+def vmess_fingerprint(data):
+    """The fingerprint of decoded VMess JSON."""
+    # Extract functional fields only
+    # We assume if IP, Port, ID, and Network match, it's the same server.
+    # 'add' = address, 'id' = uuid
+    return (
+        f"vmess|"
+        f"{data.get('add', '').lower()}|"
+        f"{data.get('port', '')}|"
+        f"{data.get('id', '')}|"
+        f"{data.get('net', '')}|"
+        f"{data.get('path', '')}|"
+        f"{data.get('host', '')}|"
+        f"{data.get('sni', '')}"
+    )
+
+
 def get_url_fingerprint(link):
     """
     Parses standard URI schemes (VLESS, Trojan, Tuic, Hysteria).
@@ -58,28 +65,32 @@ def get_url_fingerprint(link):
         # Parse query params to sort them (to ensure order doesn't matter)
         query = urllib.parse.parse_qs(parsed.query)
 
-        # Extract critical params for uniqueness
-        # We care about: security, sni, type, serviceName, path, host
-        relevant_params = []
-        for key in ["security", "sni", "host", "type", "serviceName", "path"]:
-            val = query.get(key, [""])[0]
-            if val:
-                relevant_params.append(f"{key}={val}")
-
-        params_str = "|".join(sorted(relevant_params))
-
-        fingerprint = (
-            f"{parsed.scheme}|"
-            f"{parsed.hostname.lower()}|"
-            f"{parsed.port}|"
-            f"{parsed.username}|"
-            f"{params_str}"
-        )
-        return fingerprint
+        return url_fingerprint(parsed, query)
     except Exception:
         return None
 
 
+def url_fingerprint(parsed, query):
+    """The fingerprint of a parsed URI and its query params."""
+    # Extract critical params for uniqueness
+    # We care about: security, sni, type, serviceName, path, host
+    relevant_params = []
+    for key in ["security", "sni", "host", "type", "serviceName", "path"]:
+        val = query.get(key, [""])[0]
+        if val:
+            relevant_params.append(f"{key}={val}")
+
+    params_str = "|".join(sorted(relevant_params))
+
+    return (
+        f"{parsed.scheme}|"
+        f"{parsed.hostname.lower()}|"
+        f"{parsed.port}|"
+        f"{parsed.username}|"
+        f"{params_str}"
+    )
+
+
 def get_ss_fingerprint(link):
     """
     Parses Shadowsocks (SS) links.
@@ -104,16 +115,31 @@ def get_ss_fingerprint(link):
         return None
 
 
-def generate_fingerprint(config):
+def digest_fingerprint(fgp):
+    """Compact form of a fingerprint: the 16-byte BLAKE2b digest of it."""
+    return hashlib.blake2b(fgp.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def generate_fingerprint(config, compact=False):
     """
     Main router function to handle different protocols.
+    With `compact`, returns the digest of the fingerprint instead; call
+    again without it to see the readable form when debugging.
     """
+    # Surrounding whitespace isn't part of the link, as in V2rayConfig
+    config = config.strip()
+
     if config.startswith("vmess://"):
-        return get_vmess_fingerprint(config)
+        fgp = get_vmess_fingerprint(config)
     elif config.startswith("ss://"):
-        return get_ss_fingerprint(config)
+        fgp = get_ss_fingerprint(config)
     elif config.startswith(("vless://", "trojan://", "tuic://", "hysteria")):
-        return get_url_fingerprint(config)
+        fgp = get_url_fingerprint(config)
+    else:
+        # Fallback: if we don't know the protocol, just use the link itself
+        fgp = config
+
+    if compact and fgp:
+        return digest_fingerprint(fgp)
 
-    # Fallback: if we don't know the protocol, just use the link itself
-    return config
+    return fgp
@@ -0,0 +1,21 @@
+from typing import Iterable
+
+from services import fingerprint
+from services.chunk_pool import map_chunks_ordered
+
+
+def fingerprint_chunk(configs: list[str], compact: bool = False):
+    """Runs in a worker process; only the fingerprints travel back."""
+    return [fingerprint.generate_fingerprint(config, compact) for config in configs]
+
+
+def fingerprint_configs(
+    configs: Iterable[str], workers: int = 1, compact: bool = False
+):
+    """
+    Yields (config, fingerprint) pairs in input order. With more than one
+    worker, chunks of configs are fingerprinted in a process pool while
+    only a few chunks are in flight at a time, so `configs` may be a
+    stream larger than memory.
+    """
+    return map_chunks_ordered(fingerprint_chunk, configs, workers, compact)
@@ -0,0 +1,81 @@
+import datetime
+import sqlite3
+from typing import Iterable
+
+LOOKUP_CHUNK = 500  # fingerprints per SELECT, below SQLite's variable limit
+BUSY_TIMEOUT = 30  # seconds to wait for another run holding the lock
+
+
+class FingerprintStore:
+    """
+    Every config fingerprint seen by earlier runs (see `fingerprint`), with
+    when it was first and last seen and the channels that posted it.
+    Backed by a SQLite file, so several runs and machines can share it.
+
+    Readable and compact fingerprints of a server never match, so every run
+    sharing a store has to use the same COMPACT_FINGERPRINTS setting.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.conn = sqlite3.connect(file_path, timeout=BUSY_TIMEOUT)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprint_sources (
+                fingerprint TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                PRIMARY KEY (fingerprint, channel)
+            )
+            """)
+        self.conn.commit()
+
+    def known_fingerprints(self, fingerprints: Iterable[str | bytes]):
+        """Returns the subset of `fingerprints` already in the store."""
+        fingerprints = list(fingerprints)
+        known: set[str | bytes] = set()
+
+        for i in range(0, len(fingerprints), LOOKUP_CHUNK):
+            chunk = fingerprints[i : i + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT fingerprint FROM fingerprints WHERE fingerprint IN ({placeholders})",
+                chunk,
+            )
+            known.update(row[0] for row in rows)
+
+        return known
+
+    def record_seen(self, sources: dict[str | bytes, set[str]]):
+        """Marks fingerprints as seen now, adding the channels that posted them."""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO fingerprints (fingerprint, first_seen, last_seen)
+                VALUES (?, ?, ?)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    last_seen = excluded.last_seen
+                """,
+                ((fgp, now, now) for fgp in sources),
+            )
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO fingerprint_sources (fingerprint, channel)
+                VALUES (?, ?)
+                """,
+                (
+                    (fgp, channel.lower())
+                    for fgp, channels in sources.items()
+                    for channel in channels
+                ),
+            )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,160 @@
+import asyncio
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from tqdm import tqdm
+
+# Phase timings of a probe, in ms, each measured from the end of the last
+PHASE_FIELDS = ["socks_handshake_ms", "tunnel_ms", "first_byte_ms"]
+
+SOCKS_ADDRESS_SIZES = {1: 4, 4: 16}  # IPv4, IPv6; domains carry their length
+
+
+class ProbeError(Exception):
+    """A probe failed; the message goes into the result's `msg`."""
+
+
+def probe_result(
+    link: str,
+    latency: int,
+    status: str,
+    msg: str,
+    phases: list[float] | None = None,
+):
+    result = {"config": link, "latency": latency, "status": status, "msg": msg}
+    for field, value in zip(PHASE_FIELDS, phases or [""] * len(PHASE_FIELDS)):
+        result[field] = value
+    return result
+
+
+def elapsed_ms(start_ns: int, end_ns: int):
+    return round((end_ns - start_ns) / 1_000_000, 1)
+
+
+async def socks_connect(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, port: int
+):
+    """SOCKS5 CONNECT to host:port, resolved by the core."""
+    host_bytes = host.encode("idna")
+    writer.write(
+        b"\x05\x01\x00\x03"
+        + bytes([len(host_bytes)])
+        + host_bytes
+        + port.to_bytes(2, "big")
+    )
+    version, reply, _, address_type = await reader.readexactly(4)
+    if version != 5 or reply != 0:
+        raise ProbeError(f"SOCKS reply {reply}")
+
+    if address_type == 3:
+        address_size = (await reader.readexactly(1))[0]
+    else:
+        address_size = SOCKS_ADDRESS_SIZES.get(address_type, 0)
+    await reader.readexactly(address_size + 2)  # Bound address and port
+
+
+async def probe_phases(port: int, test_url: str):
+    """
+    Fetches `test_url` through the SOCKS inbound on `port`, by hand so each
+    phase can be timed: the local SOCKS greeting, the CONNECT (the core
+    answers once it has an outbound connection, or at once for cores that
+    connect lazily, in which case that time lands in the next phase) and
+    the request up to the first response byte, TLS setup included for
+    https. Returns the HTTP status and the three phase timings.
+    """
+    url = urlsplit(test_url)
+    host = url.hostname or ""
+    target_port = url.port or (443 if url.scheme == "https" else 80)
+    path = url.path or "/"
+    if url.query:
+        path += "?" + url.query
+
+    start = time.perf_counter_ns()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    try:
+        writer.write(b"\x05\x01\x00")  # SOCKS5, no authentication
+        if await reader.readexactly(2) != b"\x05\x00":
+            raise ProbeError("SOCKS greeting refused")
+        handshake_done = time.perf_counter_ns()
+
+        await socks_connect(reader, writer, host, target_port)
+        tunnel_done = time.perf_counter_ns()
+
+        if url.scheme == "https":
+            await writer.start_tls(ssl.create_default_context(), server_hostname=host)
+
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: close\r\n\r\n".encode()
+        )
+        first_byte = await reader.read(1)
+        first_byte_done = time.perf_counter_ns()
+        if not first_byte:
+            raise ProbeError("Empty response")
+
+        status_line = first_byte + await reader.readline()
+    finally:
+        writer.close()
+
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise ProbeError("Bad HTTP response")
+
+    phases = [
+        elapsed_ms(start, handshake_done),
+        elapsed_ms(handshake_done, tunnel_done),
+        elapsed_ms(tunnel_done, first_byte_done),
+    ]
+    return status, phases
+
+
+async def probe_proxy(link: str, port: int, test_url: str, timeout: float):
+    """
+    Probes one config through the core's SOCKS inbound on `port`. The probe
+    gets `timeout` seconds from when it starts, however long it waited for
+    its turn.
+    """
+    try:
+        status, phases = await asyncio.wait_for(probe_phases(port, test_url), timeout)
+
+    except asyncio.TimeoutError:
+        return probe_result(link, -1, "fail", "Timeout")
+    except Exception as e:
+        return probe_result(link, -1, "fail", str(e)[:30])
+
+    if status in [200, 204]:
+        return probe_result(link, round(sum(phases)), "success", "OK", phases)
+
+    return probe_result(link, -1, "fail", f"Status {status}")
+
+
+async def probe_batch(
+    links: list[str],
+    base_port: int,
+    test_url: str,
+    timeout: float,
+    concurrency: int,
+    desc: str | None = None,
+):
+    """
+    Probes every link of a batch on one event loop, the i-th through the
+    inbound on `base_port + i`, with at most `concurrency` probes in flight.
+    Results come back in completion order.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded_probe(port: int, link: str):
+        async with sem:
+            return await probe_proxy(link, port, test_url, timeout)
+
+    probes = [bounded_probe(base_port + i, link) for i, link in enumerate(links)]
+
+    results = []
+    for probe in tqdm(
+        asyncio.as_completed(probes), total=len(probes), desc=desc, leave=False
+    ):
+        results.append(await probe)
+
+    return results
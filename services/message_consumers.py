@@ -0,0 +1,142 @@
+import re
+
+from models.telegram_message import MessageRecord
+from models.v2ray_config import V2rayConfig
+from services.channel_crawler import MessageConsumer
+from services.config_index import FingerprintIndex
+from services.output_writer import OutputWriter
+
+CHANNEL_LINK_PATTERN = (
+    r"(?:t\.me|telegram\.me)\/(?:s\/)?([a-zA-Z0-9_]{4,})(?:$|[\/\?\#])"
+)
+
+IGNORE_LIST = {
+    "proxy",
+    "share",
+    "joinchat",
+    "addstickers",
+    "socks",
+    "bot",
+    "media",  # CSS code: @media
+    "import",  # Python/Java code: @import
+    "admin",  # Common text: "Contact @admin" (often not a real username)
+    "support",  # Common text: "Contact @support"
+    "gmail",
+    "yahoo",
+    "hotmail",
+    "protonmail",  # Email domains
+}
+
+
+class ConfigCollector(MessageConsumer):
+    """
+    Collects every config link posted in the channel, tagged with it; they
+    are renamed after the channel only when written out (see
+    `V2rayConfig.export_link`). Servers already in the shared `index` are
+    not collected again; the channel is only recorded as one more source
+    of them.
+
+    With a `writer`, configs go straight to it instead of into `configs`.
+    """
+
+    channel: str
+    configs: list[V2rayConfig]
+    collected: int
+    duplicates: int
+    index: FingerprintIndex
+    writer: OutputWriter | None
+
+    def __init__(
+        self,
+        channel: str,
+        index: FingerprintIndex | None = None,
+        writer: OutputWriter | None = None,
+    ) -> None:
+        self.channel = channel
+        self.configs = []
+        self.collected = 0
+        self.duplicates = 0
+        self.index = index if index is not None else FingerprintIndex()
+        self.writer = writer
+
+    def consume(self, msg: MessageRecord):
+        for link in msg.configs:
+            config = V2rayConfig(link, channel=self.channel)
+            fgp = self.index.fingerprint(config)
+
+            if not fgp:
+                continue  # Skip invalid configs
+
+            if fgp in self.index:
+                if self.index.add_source(fgp, self.channel):
+                    self.duplicates += 1
+                continue
+
+            self.index.add(fgp, config.link, self.channel)
+            self.collected += 1
+
+            if self.writer:
+                self.writer.write(config)
+            else:
+                self.configs.append(config)
+
+
+class ConfigDetector(MessageConsumer):
+    """Stops at the first message that contains a config link."""
+
+    found: bool
+
+    def __init__(self) -> None:
+        self.found = False
+
+    @property
+    def done(self):
+        return self.found
+
+    def consume(self, msg: MessageRecord):
+        if msg.configs:
+            self.found = True
+
+
+class ChannelLinkExtractor(MessageConsumer):
+    """
+    Collects usernames of other channels linked from the channel, handing
+    each new one to `writer` as well when given.
+    """
+
+    known_channels: set[str]
+    links: set[str]
+    writer: OutputWriter | None
+
+    def __init__(
+        self, known_channels: set[str], writer: OutputWriter | None = None
+    ) -> None:
+        self.known_channels = known_channels
+        self.links = set()
+        self.writer = writer
+
+    def consume(self, msg: MessageRecord):
+        for msg_link in msg.links:
+            msg_link = (
+                msg_link.replace("https://", "")
+                .replace("http://", "")
+                .replace("www.", "")
+            )
+
+            match = re.match(CHANNEL_LINK_PATTERN, msg_link)
+
+            if match:
+                username = match.group(1).lower()
+
+                if username in IGNORE_LIST:
+                    continue
+
+                if username.endswith("bot"):
+                    continue
+
+                if username in self.known_channels or username in self.links:
+                    continue
+
+                self.links.add(username)
+                if self.writer:
+                    self.writer.write(username)
@@ -0,0 +1,131 @@
+from html.parser import HTMLParser
+
+from models.telegram_message import MessageRecord
+from services.parse_iso_date import parse_iso_date
+
+MESSAGE_CLASS = "tgme_widget_message"
+TEXT_CLASS = "tgme_widget_message_text"
+FORWARDED_FROM_CLASS = "tgme_widget_message_forwarded_from_name"
+
+
+def has_class(attrs: list[tuple[str, str | None]], class_name: str):
+    for name, value in attrs:
+        if name == "class":
+            return bool(value) and class_name in value.split()
+    return False
+
+
+def get_attr(attrs: list[tuple[str, str | None]], attr_name: str):
+    for name, value in attrs:
+        if name == attr_name:
+            return value
+    return None
+
+
+class MessageExtractor(HTMLParser):
+    """
+    Streaming tokenizer for t.me/s pages. Instead of building a full tree,
+    it only tracks the tags the crawlers read (message div, time, text div,
+    links) and emits one MessageRecord per message in a single pass.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.messages: list[MessageRecord] = []
+
+        self.current: MessageRecord | None = None
+        self.div_depth = 0
+        self.text_div_depth = 0
+        self.text_parts: list[str] = []
+        self.in_text = False
+        self.text_done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.current is None:
+            if tag == "div" and has_class(attrs, MESSAGE_CLASS):
+                self.start_message(attrs)
+            return
+
+        if tag == "div":
+            self.div_depth += 1
+            if not self.in_text and not self.text_done and has_class(attrs, TEXT_CLASS):
+                self.in_text = True
+                self.text_div_depth = self.div_depth
+
+        elif tag == "br":
+            if self.in_text:
+                self.text_parts.append("\n")
+
+        elif tag == "a":
+            href = get_attr(attrs, "href")
+            if href:
+                self.current.links.append(href)
+
+                if self.current.forwarded_from is None and has_class(
+                    attrs, FORWARDED_FROM_CLASS
+                ):
+                    parts = href.split("/")
+                    if len(parts) > 3:
+                        self.current.forwarded_from = parts[3]
+
+        elif tag == "time":
+            if self.current.datetime is None and has_class(attrs, "time"):
+                datetime_str = get_attr(attrs, "datetime")
+                if datetime_str:
+                    self.current.datetime = parse_iso_date(datetime_str)
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <a .../> and friends never open a scope
+        if tag == "div":
+            return
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if self.current is None or tag != "div":
+            return
+
+        if self.in_text and self.div_depth == self.text_div_depth:
+            self.in_text = False
+            self.text_done = True
+            self.current.text = "".join(self.text_parts)
+
+        self.div_depth -= 1
+        if self.div_depth == 0:
+            self.end_message()
+
+    def handle_data(self, data):
+        if self.in_text:
+            self.text_parts.append(data)
+
+    def start_message(self, attrs):
+        msg_id = None
+        post_data = get_attr(attrs, "data-post")
+        if post_data:
+            id_str = post_data.split("/")[-1]
+            if id_str.isdigit():
+                msg_id = int(id_str)
+
+        self.current = MessageRecord(id=msg_id)
+        self.div_depth = 1
+        self.text_parts = []
+        self.in_text = False
+        self.text_done = False
+
+    def end_message(self):
+        if self.current is not None:
+            if self.in_text:
+                self.current.text = "".join(self.text_parts)
+            self.messages.append(self.current)
+        self.current = None
+
+
+def extract_messages(html: str):
+    """Returns the page's messages newest first, like the crawlers expect."""
+    extractor = MessageExtractor()
+    extractor.feed(html)
+    extractor.close()
+    extractor.end_message()
+
+    messages = extractor.messages
+    messages.reverse()
+    return messages
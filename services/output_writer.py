@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from models.v2ray_config import V2rayConfig
+
+FLUSH_LINES = 1000
+FLUSH_SECONDS = 1.0
+
+
+class OutputWriter:
+    """
+    Writes the lines of one output file from a single background task.
+
+    Crawl tasks hand lines over with `write` without ever blocking on disk;
+    the task keeps one file handle open and flushes whenever `flush_lines`
+    lines are buffered or the oldest buffered line is `flush_seconds` old,
+    so a crash loses at most one flush interval.
+
+    Configs may be written as `V2rayConfig`s; they are renamed after their
+    channel in one pass per flush, off the crawl tasks.
+    """
+
+    file_path: str
+    lines: int
+
+    def __init__(
+        self,
+        file_path: str,
+        flush_lines: int = FLUSH_LINES,
+        flush_seconds: float = FLUSH_SECONDS,
+    ) -> None:
+        self.file_path = file_path
+        self.flush_lines = flush_lines
+        self.flush_seconds = flush_seconds
+        self.lines = 0
+
+    async def __aenter__(self):
+        self.file = open(self.file_path, "w", encoding="utf-8")
+        self.queue: asyncio.Queue[str | V2rayConfig | None] = asyncio.Queue()
+        self.task = asyncio.create_task(self.write_loop())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.queue.put_nowait(None)
+        await self.task
+        self.file.close()
+
+    def write(self, line: str | V2rayConfig):
+        self.lines += 1
+        self.queue.put_nowait(line)
+
+    async def write_loop(self):
+        buffer: list[str | V2rayConfig] = []
+        flush_at = None
+
+        while True:
+            timeout = None if flush_at is None else max(0, flush_at - time.monotonic())
+            try:
+                line = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                self.flush(buffer)
+                flush_at = None
+                continue
+
+            if line is None:
+                break
+
+            buffer.append(line)
+            if flush_at is None:
+                flush_at = time.monotonic() + self.flush_seconds
+
+            if len(buffer) >= self.flush_lines:
+                self.flush(buffer)
+                flush_at = None
+
+        self.flush(buffer)
+
+    def flush(self, buffer: list[str | V2rayConfig]):
+        if not buffer:
+            return
+
+        lines = (
+            line.export_link if isinstance(line, V2rayConfig) else line
+            for line in buffer
+        )
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        buffer.clear()
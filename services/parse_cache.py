@@ -0,0 +1,153 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable
+
+LOOKUP_CHUNK = 500  # links per SELECT, below SQLite's variable limit
+BUSY_TIMEOUT = 30  # seconds to wait for another run holding the lock
+HASH_SIZE = 16  # bytes
+
+# The code that turns a link into a validated outbound
+PARSER_SOURCES = [
+    Path(__file__).parent / "parse_config_link.py",
+    Path(__file__).parent / "config_filter.py",
+    Path(__file__).parent.parent / "models" / "v2ray_config.py",
+]
+
+# (outbound JSON, None) for a supported link, (None, rejection reason) otherwise
+ParseResult = tuple[str | None, str | None]
+
+
+def parser_version():
+    """Hash of the parser sources, so changing them invalidates older entries."""
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    for path in PARSER_SOURCES:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def link_hash(link: str):
+    return hashlib.blake2b(link.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+class ParseCache:
+    """
+    The validated sing-box outbound or the rejection reason of every link
+    parsed by earlier runs, keyed by link hash, so a daily run only parses
+    the links it hasn't seen. Entries cached by another parser version are
+    dropped on open, and the least recently used ones once the cache holds
+    more than `max_entries`. Backed by a local SQLite file.
+    """
+
+    hits: int
+    misses: int
+
+    def __init__(self, file_path: str, max_entries: int, refresh: bool = False) -> None:
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(file_path, timeout=BUSY_TIMEOUT)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parsed_links (
+                link_hash BLOB PRIMARY KEY,
+                outbound TEXT,
+                reason TEXT,
+                used_at REAL NOT NULL
+            )
+            """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parse_cache_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """)
+        self.conn.commit()
+        self.check_version()
+
+    def check_version(self):
+        version = parser_version()
+        row = self.conn.execute(
+            "SELECT value FROM parse_cache_meta WHERE key = 'parser_version'"
+        ).fetchone()
+
+        if row and row[0] == version:
+            return
+
+        with self.conn:
+            self.conn.execute("DELETE FROM parsed_links")
+            self.conn.execute(
+                """
+                INSERT INTO parse_cache_meta (key, value) VALUES ('parser_version', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (version,),
+            )
+
+    def lookup(self, links: Iterable[str]):
+        """Returns {link: result} for the links already in the cache."""
+        hashes = {link_hash(link): link for link in links}
+        results: dict[str, ParseResult] = {}
+
+        if not self.refresh:
+            keys = list(hashes)
+            now = time.time()
+            with self.conn:
+                for i in range(0, len(keys), LOOKUP_CHUNK):
+                    chunk = keys[i : i + LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self.conn.execute(
+                        f"SELECT link_hash, outbound, reason FROM parsed_links WHERE link_hash IN ({placeholders})",
+                        chunk,
+                    )
+                    for key, outbound, reason in rows:
+                        results[hashes[key]] = (outbound, reason)
+
+                    # Hits count as used now, for eviction
+                    self.conn.execute(
+                        f"UPDATE parsed_links SET used_at = ? WHERE link_hash IN ({placeholders})",
+                        [now, *chunk],
+                    )
+
+        self.hits += len(results)
+        self.misses += len(hashes) - len(results)
+        return results
+
+    def store(self, results: dict[str, ParseResult]):
+        """Caches freshly parsed links, then evicts the least recently used."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO parsed_links (link_hash, outbound, reason, used_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(link_hash) DO UPDATE SET
+                    outbound = excluded.outbound,
+                    reason = excluded.reason,
+                    used_at = excluded.used_at
+                """,
+                (
+                    (link_hash(link), outbound, reason, now)
+                    for link, (outbound, reason) in results.items()
+                ),
+            )
+            self.evict()
+
+    def evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM parsed_links").fetchone()
+        if count <= self.max_entries:
+            return
+
+        self.conn.execute(
+            """
+            DELETE FROM parsed_links WHERE link_hash IN (
+                SELECT link_hash FROM parsed_links ORDER BY used_at LIMIT ?
+            )
+            """,
+            (count - self.max_entries,),
+        )
+
+    def close(self):
+        self.conn.close()
@@ -20,14 +20,26 @@ def safe_base64_decode(s):
             return ""
 
 
-def parse_vmess(link):
-    """Parses VMess (base64 encoded JSON)."""
-    b64_str = link[8:]
+def decode_vmess(link):
+    """Decodes the JSON payload of a VMess link."""
     try:
-        data = json.loads(safe_base64_decode(b64_str))
+        data = json.loads(safe_base64_decode(link[8:]))
     except Exception:
         raise ValueError("Invalid VMess base64")
 
+    if not isinstance(data, dict):
+        raise ValueError("Invalid VMess base64")
+
+    return data
+
+
+def parse_vmess(link):
+    """Parses VMess (base64 encoded JSON)."""
+    return vmess_outbound(decode_vmess(link))
+
+
+def vmess_outbound(data):
+    """Builds the outbound from decoded VMess JSON."""
     outbound = {
         "type": "vmess",
         "tag": data.get("ps", "vmess-proxy"),
@@ -224,8 +236,11 @@ def parse_shadowsocks(link):
 def parse_standard_uri(link, protocol):
     """Generic parser."""
     parsed = urlparse(link)
-    params = parse_qs(parsed.query)
+    return uri_outbound(parsed, parse_qs(parsed.query), protocol)
+
 
+def uri_outbound(parsed, params, protocol):
+    """Builds the outbound from a parsed URI and its query params."""
     outbound = {
         "type": protocol,
         "tag": unquote(parsed.fragment) if parsed.fragment else f"{protocol}-proxy",
@@ -257,7 +272,7 @@ def parse_standard_uri(link, protocol):
     sni = params.get("sni", [""])[0]
     fp = params.get("fp", [""])[0]
 
-    if security == "tls" or protocol in ["tuic", "hysteria2", "hy2"]:
+    if security in ["tls", "reality"] or protocol in ["tuic", "hysteria2", "hy2"]:
         outbound["tls"] = {
             "enabled": True,
             "server_name": sni if sni else parsed.hostname,
@@ -287,20 +302,28 @@ def parse_standard_uri(link, protocol):
     return outbound
 
 
+def uri_protocol(link):
+    """The outbound type of a link handled by `parse_standard_uri`, if any."""
+    if link.startswith("vless://"):
+        return "vless"
+    if link.startswith("trojan://"):
+        return "trojan"
+    if link.startswith("tuic://"):
+        return "tuic"
+    if "hysteria2" in link or "hy2://" in link:
+        return "hysteria2"
+    return None
+
+
 def parse_link(link):
     link = link.strip()
     if link.startswith("vmess://"):
         return parse_vmess(link)
     if link.startswith("ss://"):
         return parse_shadowsocks(link)
-    if link.startswith("vless://"):
-        return parse_standard_uri(link, "vless")
-    if link.startswith("trojan://"):
-        return parse_standard_uri(link, "trojan")
-    if link.startswith("tuic://"):
-        return parse_standard_uri(link, "tuic")
-    if "hysteria2" in link or "hy2://" in link:
-        return parse_standard_uri(link, "hysteria2")
+    protocol = uri_protocol(link)
+    if protocol:
+        return parse_standard_uri(link, protocol)
     raise ValueError("Unsupported protocol")
 
 
@@ -0,0 +1,56 @@
+import asyncio
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from models.v2ray_config import CONFIG_PATTERN
+from services.message_extractor import extract_messages
+
+
+def parse_page(html: bytes):
+    """
+    CPU-bound half of loading a page: decodes the raw HTML, extracts the
+    message records and finds the config links in every message text.
+    Runs in a worker process, so it must only touch picklable data.
+    """
+    messages = extract_messages(html.decode("utf-8", errors="replace"))
+
+    for msg in messages:
+        if msg.text:
+            msg.configs = [
+                config.rstrip(".:,;!?")
+                for config in re.findall(CONFIG_PATTERN, msg.text)
+            ]
+
+    return messages
+
+
+class ParseExecutor:
+    """
+    Runs `parse_page` off the event loop in a process pool, so network I/O
+    and HTML parsing scale independently. With 0 workers pages are parsed
+    inline on the event loop.
+    """
+
+    workers: int
+    pool: ProcessPoolExecutor | None
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.pool = None
+
+    async def __aenter__(self):
+        if self.workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def parse(self, html: bytes):
+        if self.pool is None:
+            return parse_page(html)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, parse_page, html)
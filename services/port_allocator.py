@@ -0,0 +1,49 @@
+import socket
+import threading
+
+MAX_PORT = 65535
+
+
+def port_is_free(port: int):
+    """True if nothing listens on the local port right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+class PortAllocator:
+    """
+    Hands out disjoint runs of free local ports, starting the search at
+    `first_port`. A range stays taken until released, even before the core
+    using it starts listening; ports another program holds are skipped.
+    """
+
+    def __init__(self, first_port: int) -> None:
+        self.first_port = first_port
+        self.taken: dict[int, int] = {}  # start port: size
+        self.lock = threading.Lock()
+
+    def is_taken(self, port: int):
+        return any(start <= port < start + size for start, size in self.taken.items())
+
+    def allocate(self, size: int):
+        """Returns the first port of `size` consecutive free ports."""
+        with self.lock:
+            start = self.first_port
+            while start + size - 1 <= MAX_PORT:
+                for port in range(start, start + size):
+                    if self.is_taken(port) or not port_is_free(port):
+                        start = port + 1
+                        break
+                else:
+                    self.taken[start] = size
+                    return start
+
+        raise RuntimeError(f"No {size} free consecutive ports from {self.first_port}")
+
+    def release(self, start: int):
+        with self.lock:
+            self.taken.pop(start, None)
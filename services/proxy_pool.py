@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+from services.rate_limiter import AdaptiveRateLimiter
+
+BENCH_AFTER_FAILURES = 3
+BENCH_TIME = 60  # seconds, doubles every time the same proxy is benched again
+MAX_BENCH_TIME = 900
+LATENCY_SMOOTHING = 0.3
+
+
+class ProxyEndpoint:
+    """One upstream proxy: its own session, rate limiter and health stats."""
+
+    url: str
+    session: aiohttp.ClientSession
+    limiter: AdaptiveRateLimiter
+
+    def __init__(self, url: str, limiter: AdaptiveRateLimiter) -> None:
+        self.url = url
+        self.limiter = limiter
+        self.session = aiohttp.ClientSession(connector=ProxyConnector.from_url(url))
+
+        self.latency: float | None = None  # seconds, moving average
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.times_benched = 0
+        self.benched_until = 0.0
+
+    def is_benched(self, now: float):
+        return now < self.benched_until
+
+    def expected_start(self, now: float):
+        """When a request sent through this proxy would be answered, roughly."""
+        start = max(now, self.benched_until, self.limiter.next_available())
+        return start + (self.latency or 0.0)
+
+
+class ProxyPool:
+    """
+    Spreads t.me requests across several upstream proxies (exit IPs). Each
+    request goes to the proxy expected to answer soonest given its rate
+    limiter and latency; a proxy that keeps failing is benched for a while.
+    """
+
+    endpoints: list[ProxyEndpoint]
+
+    def __init__(
+        self, proxy_urls: str | list[str], initial_rate: float, max_rate: float
+    ) -> None:
+        if isinstance(proxy_urls, str):
+            proxy_urls = [proxy_urls]
+
+        self.proxy_urls = proxy_urls
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.endpoints = []
+
+    async def __aenter__(self):
+        self.endpoints = [
+            ProxyEndpoint(url, AdaptiveRateLimiter(self.initial_rate, self.max_rate))
+            for url in self.proxy_urls
+        ]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for endpoint in self.endpoints:
+            await endpoint.session.close()
+
+    async def acquire(self):
+        """Picks a proxy and waits until it may send the next request."""
+        now = time.monotonic()
+        endpoint = min(self.endpoints, key=lambda e: e.expected_start(now))
+
+        if endpoint.is_benched(now):
+            await asyncio.sleep(endpoint.benched_until - now)
+
+        await endpoint.limiter.acquire()
+        endpoint.requests += 1
+        return endpoint
+
+    def on_success(self, endpoint: ProxyEndpoint, latency: float):
+        endpoint.consecutive_failures = 0
+        endpoint.times_benched = 0
+        endpoint.limiter.on_success()
+
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += LATENCY_SMOOTHING * (latency - endpoint.latency)
+
+    def on_failure(self, endpoint: ProxyEndpoint, retry_after: float | None = None):
+        """Records a 429/5xx or connection error and returns the pause in seconds."""
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        pause = endpoint.limiter.on_failure(retry_after)
+
+        if endpoint.consecutive_failures >= BENCH_AFTER_FAILURES:
+            bench_time = min(MAX_BENCH_TIME, BENCH_TIME * 2**endpoint.times_benched)
+            endpoint.benched_until = time.monotonic() + bench_time
+            endpoint.times_benched += 1
+            endpoint.consecutive_failures = 0
+            print(f"! Proxy {endpoint.url} benched for {bench_time}s")
+
+        return pause
+
+    def print_report(self):
+        print("   • Proxies:")
+        for endpoint in self.endpoints:
+            latency = f"{round(endpoint.latency * 1000)}ms" if endpoint.latency else "-"
+            print(
+                f"       {endpoint.url:<30} | Requests: {endpoint.requests} | "
+                f"Failures: {endpoint.failures} | Latency: {latency} | "
+                f"Rate: {endpoint.limiter.rate:.1f}/s"
+            )
@@ -0,0 +1,89 @@
+import asyncio
+import email.utils
+import time
+
+MIN_RATE = 0.2  # requests per second
+DECREASE_FACTOR = 0.5
+BASE_PAUSE = 5  # seconds
+MAX_PAUSE = 120
+
+
+def parse_retry_after(value: str | None):
+    """Parses a Retry-After header (delay in seconds or an HTTP date)."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Global request pacer shared by every crawl task (AIMD).
+
+    Requests are spaced 1/rate seconds apart. Every success raises the rate
+    additively (about +1 req/s per second of clean traffic), every 429/5xx or
+    proxy error halves it and pauses all tasks together, honoring Retry-After
+    when the server sends one. Consecutive failures double the pause.
+    """
+
+    rate: float
+    max_rate: float
+
+    def __init__(self, initial_rate: float, max_rate: float) -> None:
+        self.rate = max(MIN_RATE, initial_rate)
+        self.max_rate = max(self.rate, max_rate)
+
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.failures = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until this task may send its next request."""
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                slot = max(now, self.next_slot, self.paused_until)
+                self.next_slot = slot + 1 / self.rate
+
+            await asyncio.sleep(slot - now)
+
+            # A pause may have started while we were waiting for our slot
+            if time.monotonic() >= self.paused_until:
+                return
+
+    def next_available(self):
+        """Monotonic time at which the next request could be sent."""
+        return max(self.next_slot, self.paused_until)
+
+    def on_success(self):
+        self.failures = 0
+        self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+    def on_failure(self, retry_after: float | None = None):
+        """
+        Backs off after a throttled or failed request and returns the pause
+        in seconds. Failures that arrive during an ongoing pause belong to
+        the same incident and do not cut the rate again.
+        """
+        now = time.monotonic()
+        if now < self.paused_until and retry_after is None:
+            return self.paused_until - now
+
+        self.failures += 1
+        self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+
+        if retry_after is None:
+            retry_after = min(MAX_PAUSE, BASE_PAUSE * 2 ** (self.failures - 1))
+
+        self.paused_until = max(self.paused_until, now + retry_after)
+        return self.paused_until - now
@@ -24,44 +24,78 @@ def rename_vmess(link, channel_name):
         decoded_json = safe_base64_decode(payload)
         data = json.loads(decoded_json)
 
-        # Get current name and prepend channel
-        current_name = data.get("ps", "Server")
-        new_name = f"{channel_name} | {current_name}"
-
-        data["ps"] = new_name
-
-        # Re-encode
-        new_payload = json.dumps(data)
-        encoded_payload = safe_base64_encode(new_payload)
-        return f"vmess://{encoded_payload}"
+        return rename_vmess_data(data, channel_name)[0]
     except Exception:
         return link  # If fails, return original
 
 
+def rename_vmess_data(data, channel_name):
+    """
+    Renames decoded VMess JSON, leaving `data` untouched.
+    Returns the new link and its JSON.
+    """
+    # Get current name and prepend channel
+    current_name = data.get("ps", "Server")
+    new_name = f"{channel_name} | {current_name}"
+
+    renamed = {**data, "ps": new_name}
+
+    # Re-encode
+    new_payload = json.dumps(renamed)
+    encoded_payload = safe_base64_encode(new_payload)
+    return f"vmess://{encoded_payload}", renamed
+
+
 def rename_url_config(link, channel_name):
     """Handles VLESS, Trojan, SS, Tuic, Hysteria."""
     try:
         parsed = urllib.parse.urlparse(link)
 
-        # Get current fragment (remark)
-        current_remark = parsed.fragment
-        if not current_remark:
-            current_remark = "Server"
+        return rename_parsed_url(parsed, channel_name)[0]
+    except Exception:
+        return link
+
 
-        # Create new remark
-        new_remark = f"{channel_name} | {current_remark}"
+def rename_parsed_url(parsed, channel_name):
+    """Renames a parsed URI. Returns the new link and its parsed form."""
+    # Get current fragment (remark)
+    current_remark = parsed.fragment
+    if not current_remark:
+        current_remark = "Server"
 
-        # Rebuild URL with new fragment
-        new_parsed = parsed._replace(fragment=new_remark)
-        return urllib.parse.urlunparse(new_parsed)
+    # Create new remark
+    new_remark = f"{channel_name} | {current_remark}"
+
+    # Rebuild URL with new fragment
+    new_parsed = parsed._replace(fragment=new_remark)
+    return urllib.parse.urlunparse(new_parsed), new_parsed
+
+
+def get_channel_name(link):
+    """Reads back the channel name `rename_config` put in front of the remark."""
+    try:
+        if link.startswith("vmess://"):
+            payload = link.replace("vmess://", "")
+            remark = json.loads(safe_base64_decode(payload)).get("ps", "")
+        else:
+            remark = urllib.parse.unquote(urllib.parse.urlparse(link).fragment)
     except Exception:
-        return link
+        return None
+
+    if " | " not in remark:
+        return None
+
+    return remark.split(" | ", 1)[0].strip() or None
+
+
+def clean_channel_name(channel_name):
+    """Cleans up the channel name (removes @ or http)."""
+    return str(channel_name).split("/")[-1].replace("@", "").strip()
 
 
 def rename_config(link, channel_name):
     """Main entry point to rename any config."""
-    # Clean up the channel name (remove @ or http)
-    clean_name = str(channel_name).split("/")[-1].replace("@", "").strip()
+    clean_name = clean_channel_name(channel_name)
 
     if link.startswith("vmess://"):
         return rename_vmess(link, clean_name)
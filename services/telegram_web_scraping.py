@@ -1,15 +1,26 @@
 import asyncio
+import math
+import time
 
 import aiohttp
 from aiohttp_socks import ProxyConnectionError, ProxyError, ProxyTimeoutError
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 
+from services.parse_executor import ParseExecutor, parse_page
 from services.parse_iso_date import parse_iso_date
+from services.proxy_pool import ProxyPool
+from services.rate_limiter import parse_retry_after
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-PROXY_URL = "socks5://127.0.0.1:12334"
 MAX_RETRIES = 5
-BASE_DELAY = 5
+
+
+class ChannelNotFoundError(Exception):
+    """The channel's first page answered 404."""
+
+
+class PageFetchError(Exception):
+    """A page couldn't be loaded: retries ran out, or t.me refused it."""
 
 
 def get_message_id(msg: Tag):
@@ -109,41 +120,58 @@ def get_message_links(msg: Tag):
 
 
 async def load_channel_messages(
-    channel: str, session: aiohttp.ClientSession, before: str | None = None
+    channel: str,
+    proxies: ProxyPool,
+    before: int | None = None,
+    parser: ParseExecutor | None = None,
 ):
-
+    """
+    Loads one page of the channel's web preview. Every attempt goes through
+    the proxy the pool expects to answer soonest; throttling and connection
+    errors are reported back so that proxy backs off. Returns None when the
+    page loaded but holds no messages. Raises ChannelNotFoundError when the
+    channel itself does not exist, and PageFetchError when the page couldn't
+    be loaded, so a failed fetch is never mistaken for an empty channel.
+    """
     channel_url = f"https://t.me/s/{channel}"
     if before:
         channel_url += f"?before={before}"
 
     for attempt in range(MAX_RETRIES):
-        try:
+        proxy = await proxies.acquire()
 
-            async with session.get(channel_url, headers=HEADERS) as response:
+        try:
+            start = time.monotonic()
+            async with proxy.session.get(channel_url, headers=HEADERS) as response:
                 if response.status == 200:
-                    html = await response.text()
+                    html = await response.read()
+                    proxies.on_success(proxy, time.monotonic() - start)
 
-                    soup = BeautifulSoup(html, "html.parser")
-                    messages = soup.find_all("div", class_="tgme_widget_message")
+                    if parser:
+                        messages = await parser.parse(html)
+                    else:
+                        messages = parse_page(html)
 
                     if not messages:
                         # print(f"[!] No messages found for {channel} (Private/Empty?)")
                         return None
 
-                    messages.reverse()
                     return messages
 
                 elif response.status == 429 or response.status >= 500:
-                    wait_time = BASE_DELAY * (attempt + 1)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    wait_time = math.ceil(proxies.on_failure(proxy, retry_after))
                     print(
-                        f"! {channel:<30} | Rate Limit ({response.status}). Retrying in {wait_time}s..."
+                        f"! {channel:<30} | Rate Limit ({response.status}). Pausing {proxy.url} for {wait_time}s..."
                     )
-                    await asyncio.sleep(wait_time)
                     continue
 
+                elif response.status == 404 and not before:
+                    raise ChannelNotFoundError(channel)
+
                 # Hard Failure (404 Not Found, etc.)
                 else:
-                    return None
+                    raise PageFetchError(f"{channel}: HTTP {response.status}")
         except (
             aiohttp.ClientError,
             asyncio.TimeoutError,
@@ -152,10 +180,11 @@ async def load_channel_messages(
             ProxyTimeoutError,
         ):
             # Connection Dropped (IP Block often looks like this)
-            wait_time = BASE_DELAY * (attempt + 1)
-            print(f"! {channel:<30} | Connection Error. Retrying in {wait_time}s...")
-            await asyncio.sleep(wait_time)
+            wait_time = math.ceil(proxies.on_failure(proxy))
+            print(
+                f"! {channel:<30} | Connection Error. Pausing {proxy.url} for {wait_time}s..."
+            )
             continue
 
     print(f"✗ {channel:<30} | Failed after {MAX_RETRIES} retries")
-    return None
+    raise PageFetchError(f"{channel}: failed after {MAX_RETRIES} retries")
@@ -1,24 +1,25 @@
-import base64
+import asyncio
 import csv
 import json
 import os
-import re
 import shutil
 import socket
 import subprocess
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
 from pathlib import Path
 
-import requests
-from tqdm import tqdm
-
 from models.settings import load_settings
 from models.v2ray_config import V2rayConfig
-from services import parse_config_link
+from services.config_filter import parse_links
+from services.core_shards import CoreShard, ShardPool
+from services.latency_prober import PHASE_FIELDS, probe_batch
+from services.parse_cache import ParseCache
+from services.port_allocator import PortAllocator
 from services.read_configs import read_configs
 
 MASS_CONFIG_FILE = "mass_config.json"
+RESULT_FIELDS = ["config", "latency", "status", "msg", *PHASE_FIELDS]
 
 settings = load_settings("./settings.json")
 
@@ -35,7 +36,9 @@ def wait_for_port(port, timeout=5):
     return False
 
 
-def generate_mass_config(v2ray_configs: list[V2rayConfig]):
+def generate_mass_config(
+    v2ray_configs: list[V2rayConfig], base_port: int = settings.BASE_PORT
+):
     """Generates a single JSON config with N inbounds and N outbounds."""
     inbounds = []
     outbounds = []
@@ -44,7 +47,7 @@ def generate_mass_config(v2ray_configs: list[V2rayConfig]):
     outbounds.append({"type": "direct", "tag": "direct"})
 
     for i, conf in enumerate(v2ray_configs):
-        port = settings.BASE_PORT + i
+        port = base_port + i
         tag = f"proxy-{i}"
 
         inbounds.append(
@@ -56,8 +59,8 @@ def generate_mass_config(v2ray_configs: list[V2rayConfig]):
             }
         )
 
-        conf.parsed_data["tag"] = tag
-        outbounds.append(conf.parsed_data)
+        conf.outbound["tag"] = tag
+        outbounds.append(conf.outbound)
         rules.append({"inbound": f"in-{i}", "outbound": tag})
 
     return {
@@ -68,201 +71,99 @@ def generate_mass_config(v2ray_configs: list[V2rayConfig]):
     }
 
 
-def ping_proxy(args):
-    """Performs the HTTP check."""
-    index, link_original = args
-    port = settings.BASE_PORT + index
-
-    proxies = {
-        "http": f"socks5://127.0.0.1:{port}",
-        "https": f"socks5://127.0.0.1:{port}",
-    }
-
-    try:
-        start = time.time()
-        with requests.Session() as s:
-            resp = s.get(settings.TEST_URL, proxies=proxies, timeout=settings.TIMEOUT)
-
-        latency = (time.time() - start) * 1000
-
-        if resp.status_code in [200, 204]:
-            return {
-                "config": link_original,
-                "latency": round(latency),
-                "status": "success",
-                "msg": "OK",
-            }
-        else:
-            return {
-                "config": link_original,
-                "latency": -1,
-                "status": "fail",
-                "msg": f"Status {resp.status_code}",
-            }
-
-    except requests.exceptions.Timeout:
-        return {
-            "config": link_original,
-            "latency": -1,
-            "status": "fail",
-            "msg": "Timeout",
-        }
-    except Exception as e:
-        return {
-            "config": link_original,
-            "latency": -1,
-            "status": "fail",
-            "msg": str(e)[:30],
-        }
-
-
-SS_2022_METHODS = {
-    "2022-blake3-aes-128-gcm",
-    "2022-blake3-aes-256-gcm",
-    "2022-blake3-chacha20-poly1305",
-}
-
-
-def is_valid_base64_key(key_str, required_len=None):
-    """
-    Checks if a string is a valid Base64 key.
-    required_len: Expected byte length (e.g., 32 for Reality, 16 or 32 for SS-2022)
-    """
-    if not key_str:
-        return False
-
-    if not re.match(r"^[A-Za-z0-9+\/\-_=]+$", key_str):
-        return False
-
-    try:
-        s = key_str.replace("-", "+").replace("_", "/")
-        padding = len(s) % 4
-        if padding:
-            s += "=" * (4 - padding)
-
-        decoded = base64.b64decode(s, validate=True)
-
-        if required_len and len(decoded) != required_len:
-            return False
-
-        return True
-    except Exception:
-        return False
-
-
-VALID_FINGERPRINTS = {
-    "chrome",
-    "firefox",
-    "edge",
-    "safari",
-    "360",
-    "qq",
-    "ios",
-    "android",
-    "randomized",
-}
-
-
-def filter_supported_v2ray_configs(configs: list[V2rayConfig]):
-    valid_configs: list[V2rayConfig] = []
-
-    for config in configs:
-        try:
-            p = config.parsed_data
-
-            if not p.get("server"):
-                continue
-
-            try:
-                port = int(p.get("server_port", 0))
-                if not (1 <= port <= 65535):
-                    continue
-            except ValueError:
-                continue
-
-            if p["type"] == "shadowsocks":
-                method = p.get("method", "").lower()
-                password = p.get("password", "")
-
-                if method not in parse_config_link.VALID_SS_METHODS:
-                    continue
-                if not password:
-                    continue
-
-                if method in SS_2022_METHODS:
-                    req_len = 16 if "128" in method else 32
-                    if not is_valid_base64_key(password, req_len):
-                        continue
-
-            if p["type"] == "vless":
-                flow = p.get("flow", "").lower()
-                if flow and flow != "xtls-rprx-vision":
-                    continue
-
-            if "transport" in p:
-                t_type = p["transport"].get("type", "")
-                if t_type in ["xhttp", "tcp", "raw", "none", ""]:
-                    del p["transport"]
-                if t_type == "xhttp":
-                    continue
+def init_result_files(output_file: str, output_result_file: str):
+    """Clears old results and writes the CSV header."""
+    with open(output_result_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
 
-                if t_type in ["ws", "httpupgrade"]:
-                    path = p["transport"].get("path", "")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("")  # Clear file
 
-                    if re.search(r"%(?![0-9a-fA-F]{2})", path):
-                        continue
 
-            if "tls" in p and p["tls"]:
+def save_active_results(
+    active_results: list[dict], output_file: str, output_result_file: str
+):
+    with open(output_result_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writerows(active_results)
 
-                if "utls" in p["tls"]:
-                    fp = p["tls"]["utls"].get("fingerprint", "").lower()
+    if active_results:
+        with open(output_file, "a", encoding="utf-8") as f:
+            for res in active_results:
+                f.write(res["config"].strip() + "\n")
 
-                    if fp == "random":
-                        p["tls"]["utls"]["fingerprint"] = "randomized"
-                        fp = "randomized"
 
-                    if fp and fp not in VALID_FINGERPRINTS:
-                        del p["tls"]["utls"]
+def sort_result_file(output_result_file: str):
+    """Sorts the result CSV by latency and returns its rows."""
+    final_rows = []
+    with open(output_result_file, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        final_rows = list(reader)
 
-                if "reality" in p["tls"]:
-                    reality = p["tls"]["reality"]
-                    pbk = reality.get("public_key", "")
-                    sid = reality.get("short_id", "")
+    for r in final_rows:
+        r["latency"] = int(float(r["latency"]))
 
-                    if not is_valid_base64_key(pbk, 32):
-                        continue
+    final_rows.sort(key=lambda x: x["latency"])
 
-                    if sid and not re.match(r"^[0-9a-fA-F]+$", sid):
-                        continue
+    with open(output_result_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(final_rows)
 
-            valid_configs.append(V2rayConfig(config.link, p))
+    return final_rows
 
-        except Exception:
-            pass
 
-    return valid_configs
+def batch_failed(batch_v2ray_configs: list[V2rayConfig]):
+    return [
+        {
+            "config": conf.link,
+            "latency": -1,
+            "status": "fail",
+            "msg": "Batch Failed",
+        }
+        for conf in batch_v2ray_configs
+    ]
 
 
-def run_batch(batch_v2ray_configs: list[V2rayConfig], batch_id):
-    """Orchestrates the test for one batch of links."""
+def start_core(batch_v2ray_configs: list[V2rayConfig], shard: CoreShard):
+    """Writes the batch's config and launches the core, without waiting for it."""
 
     # 2. Generate Config
-    mass_conf = generate_mass_config(batch_v2ray_configs)
-    with open(MASS_CONFIG_FILE, "w") as f:
+    mass_conf = generate_mass_config(batch_v2ray_configs, shard.base_port)
+    with open(shard.config_file, "w") as f:
         json.dump(mass_conf, f, indent=1)
 
     # 3. Run Core
-    process = subprocess.Popen(
-        [settings.CORE_PATH, "run", "-c", MASS_CONFIG_FILE],
+    return subprocess.Popen(
+        [settings.CORE_PATH, "run", "-c", shard.config_file],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.PIPE,
         text=True,
     )
 
-    batch_results = []
+
+def stop_core(process: subprocess.Popen, shard: CoreShard):
+    process.terminate()
+    process.wait()
+    # Only remove config if it worked (keep failed ones for debugging)
+    if os.path.exists(shard.config_file) and process.poll() == 0:
+        try:
+            os.remove(shard.config_file)
+        except OSError:
+            pass
+
+
+def finish_batch(
+    process: subprocess.Popen,
+    batch_v2ray_configs: list[V2rayConfig],
+    batch_id,
+    shard: CoreShard,
+):
+    """Probes a batch through the core `start_core` launched, then stops it."""
     try:
         # Fast Start: Wait for the FIRST port in the batch to open
-        first_port = settings.BASE_PORT
+        first_port = shard.base_port
         if not wait_for_port(first_port, timeout=5):
             # Check if process died
             if process.poll() is not None:
@@ -271,44 +172,41 @@ def run_batch(batch_v2ray_configs: list[V2rayConfig], batch_id):
                 print(f"     Core Error: {stderr_data.strip()[:300]}...")
 
                 # OPTIONAL: Save the bad config for inspection
-                shutil.copy(MASS_CONFIG_FILE, f"failed_batch_{batch_id}.json")
+                shutil.copy(shard.config_file, f"failed_batch_{batch_id}.json")
                 print(f"     Saved bad config to failed_batch_{batch_id}.json")
             else:
                 print(f" [!] Batch {batch_id}: Core start timeout (No error log).")
 
             # Fail all links in this batch
-            return [
-                {
-                    "config": conf.link,
-                    "latency": -1,
-                    "status": "fail",
-                    "msg": "Batch Failed",
-                }
-                for conf in batch_v2ray_configs
-            ]
-
-        tasks = [(i, conf.link) for i, conf in enumerate(batch_v2ray_configs)]
+            return batch_failed(batch_v2ray_configs)
 
         # 4. Test Links
-        desc = f"Batch {batch_id}"
-        with ThreadPoolExecutor(max_workers=settings.MAX_WORKERS) as executor:
-            futures = [executor.submit(ping_proxy, t) for t in tasks]
-            for f in tqdm(
-                as_completed(futures), total=len(tasks), desc=desc, leave=False
-            ):
-                batch_results.append(f.result())
+        return asyncio.run(
+            probe_batch(
+                [conf.link for conf in batch_v2ray_configs],
+                shard.base_port,
+                settings.TEST_URL,
+                settings.TIMEOUT,
+                settings.MAX_WORKERS,
+                f"Batch {batch_id}",
+            )
+        )
 
     finally:
-        process.terminate()
-        process.wait()
-        # Only remove config if it worked (keep failed ones for debugging)
-        if os.path.exists(MASS_CONFIG_FILE) and process.poll() == 0:
-            try:
-                os.remove(MASS_CONFIG_FILE)
-            except OSError:
-                pass
+        stop_core(process, shard)
+
+
+def run_batch(
+    batch_v2ray_configs: list[V2rayConfig],
+    batch_id,
+    shard: CoreShard | None = None,
+):
+    """Orchestrates the test for one batch of links."""
+    if shard is None:
+        shard = CoreShard(0, settings.BASE_PORT, MASS_CONFIG_FILE)
 
-    return batch_results
+    process = start_core(batch_v2ray_configs, shard)
+    return finish_batch(process, batch_v2ray_configs, batch_id, shard)
 
 
 def test_latency(
@@ -321,43 +219,53 @@ def test_latency(
 
     inactive_v2ray_configs = v2ray_configs.copy()
 
-    for i in range(0, total_configs, settings.BATCH_SIZE):
-        batch_num = (i // settings.BATCH_SIZE) + 1
-
-        end_idx = min(i + settings.BATCH_SIZE, total_configs)
-        print(
-            f"\nProcessing Batch {batch_num}/{num_batches} (Links {i} to {end_idx})..."
-        )
-
-        current_batch_v2ray_configs = v2ray_configs[i : i + settings.BATCH_SIZE]
-        results = run_batch(current_batch_v2ray_configs, batch_num)
-
-        active_in_batch = [r for r in results if r["status"] == "success"]
-        total_active_count += len(active_in_batch)
-
-        with open(output_result_file, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f, fieldnames=["config", "latency", "status", "msg"]
+    batches = [
+        v2ray_configs[i : i + settings.BATCH_SIZE]
+        for i in range(0, total_configs, settings.BATCH_SIZE)
+    ]
+    shards = max(1, min(settings.CORE_SHARDS, num_batches))
+    print(f"\nProcessing {num_batches} batches on {shards} cores...")
+
+    allocator = PortAllocator(settings.BASE_PORT)
+    buffers = 2 if settings.BOOT_AHEAD else 1
+    with ShardPool(shards, settings.BATCH_SIZE, allocator, buffers) as pool:
+        for batch_num, results in pool.run(
+            start_core, finish_batch, stop_core, batches
+        ):
+            active_in_batch = [r for r in results if r["status"] == "success"]
+            total_active_count += len(active_in_batch)
+
+            save_active_results(active_in_batch, output_file, output_result_file)
+
+            print(
+                f"   Batch {batch_num}/{num_batches} Done: {len(active_in_batch)} active."
             )
-            writer.writerows(active_in_batch)
 
-        if active_in_batch:
-            with open(output_file, "a", encoding="utf-8") as f:
-                for res in active_in_batch:
-                    f.write(res["config"].strip() + "\n")
+            active_links_set = {r["config"] for r in active_in_batch}
 
-        print(f"   Batch {batch_num} Done: {len(active_in_batch)} active.")
+            inactive_v2ray_configs = [
+                vc for vc in inactive_v2ray_configs if vc.link not in active_links_set
+            ]
 
-        active_links_set = {r["config"] for r in active_in_batch}
+    return inactive_v2ray_configs
 
-        inactive_v2ray_configs = [
-            vc for vc in inactive_v2ray_configs if vc.link not in active_links_set
-        ]
 
-    return inactive_v2ray_configs
+def print_rejections(rejections: Counter[str]):
+    if not rejections:
+        return
+
+    print(f"Rejected {sum(rejections.values())} configs:")
+    for reason, count in rejections.most_common():
+        print(f"   {reason:<30} {count}")
 
 
-def run(configs_file: str, output_file: str, output_result_file: str):
+def run(
+    configs_file: str,
+    output_file: str,
+    output_result_file: str,
+    workers: int = 1,
+    refresh: bool = False,
+):
     if not Path(settings.CORE_PATH).exists():
         print(f"Core not found at: {settings.CORE_PATH}")
         return
@@ -370,28 +278,19 @@ def run(configs_file: str, output_file: str, output_result_file: str):
 
     print(f"Found {total_configs} configs. Filtering supported configs...")
 
-    v2ray_configs = []
-    for link in all_config_links:
-        try:
-            parsed_data = parse_config_link.parse_link(link)
-
-            v2ray_configs.append(V2rayConfig(link, parsed_data))
+    cache = ParseCache(settings.PARSE_CACHE, settings.PARSE_CACHE_SIZE, refresh)
+    supported_v2ray_configs, rejections = parse_links(all_config_links, workers, cache)
+    cache.close()
 
-        except Exception:
-            continue
-    supported_v2ray_configs = filter_supported_v2ray_configs(v2ray_configs)
+    print(f"Parsed {cache.misses} new links, {cache.hits} were cached.")
+    print_rejections(rejections)
 
     print(
         f"Found {len(supported_v2ray_configs)} supported configs. Splitting into batches of {settings.BATCH_SIZE}..."
     )
 
     # Initialize Files (Clear old results)
-    with open(output_result_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["config", "latency", "status", "msg"])
-        writer.writeheader()
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("")  # Clear file
+    init_result_files(output_file, output_result_file)
 
     for attempt in range(settings.MAX_RETRIES):
         if not supported_v2ray_configs:
@@ -408,20 +307,7 @@ def run(configs_file: str, output_file: str, output_result_file: str):
 
     print("\nFinalizing and sorting results...")
 
-    final_rows = []
-    with open(output_result_file, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        final_rows = list(reader)
-
-    for r in final_rows:
-        r["latency"] = int(float(r["latency"]))
-
-    final_rows.sort(key=lambda x: x["latency"])
-
-    with open(output_result_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["config", "latency", "status", "msg"])
-        writer.writeheader()
-        writer.writerows(final_rows)
+    final_rows = sort_result_file(output_result_file)
 
     print("\n" + "=" * 40)
     print("Testing Complete.")